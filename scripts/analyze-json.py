@@ -23,11 +23,27 @@
 
 """analyze-json.py: Given a collection of JSON documents (all nested within a 
 JSON array), this script analyzes the object and array fanout, the type 
-distribution, the number of nodes, and the depth of the given documents."""
+distribution, the number of nodes, and the depth of the given documents. 
+Optionally, it reports histograms and writes the statistics of every record 
+(see jsonstats.record_fields) as .npy, .csv, or .parquet file."""
 
+import csv
 import sys
 from argparse import ArgumentParser
-import json
+from multiprocessing import Pool
+from jsontree import iter_records, map_batches
+from jsonstats import analyze_record, tree_stats, iter_event_stats, \
+        record_row, record_fields, Statistics
+from npyfile import NpyWriter
+from treefile import is_tree_file, iter_trees, read_labels, label_kind
+from jsonparse import get_loads, available, iter_events
+from compressed import open_file
+from instrument import Progress, profile
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError: # Only needed for --records *.parquet.
+    pyarrow = None
 
 # JSON         | Python
 # -------------+--------
@@ -40,141 +56,202 @@ import json
 # false        | False
 # null         | None
 
-type_name = ["objects", " arrays", "   keys", " values"]
-type_count = [0, 0, 0, 0]
-depth = []
-object_degree = []
-array_degree = []
-
-def analyze(x, level):
-    # increment statistics on nodes with certain nesting level
-    if len(depth) < level + 1:
-        depth.append(0)
-
-    if isinstance(x, dict): # OBJECT
-        type_count[0] += 1
-        depth[level] += 1
-        
-        object_degree.append(len(x.items()))
-        # Increase depth for keys of a JSON.
-        if len(depth) <= level + 1:
-            depth.append(0)
-
-        if x != {}:
-            for k, v in x.items():
-                type_count[2] += 1
-                depth[level+1] += 1
-                analyze(v, level + 2)
-    elif isinstance(x, list): # ARRAY
-        type_count[1] += 1
-        depth[level] += 1
-        
-        array_degree.append(len(x))
-
-        if x != []:
-            for l in x:
-                analyze(l, level + 1)
-    else: # VALUE
-        type_count[3] += 1
-        depth[level] += 1
+class RecordWriter:
+    """Writes the per-record statistics (see jsonstats.record_row) in the 
+    format given by the suffix of filename: .npy (see npyfile.py), .csv 
+    (optionally compressed, see compressed.py), or .parquet (requires 
+    pyarrow)."""
 
-    return
+    # Number of rows per Parquet row group.
+    group = 65536
+
+    def __init__(self, filename):
+        name = filename
+        for suffix in ('.gz', '.xz', '.zst'):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+        self.format = name.rsplit('.', 1)[-1]
+        if self.format == 'npy':
+            self.file = NpyWriter(filename, record_fields)
+        elif self.format == 'csv':
+            self.file = open_file(filename, 'w')
+            self.csv = csv.writer(self.file, lineterminator='\n')
+            self.csv.writerow([field[0] for field in record_fields])
+        elif self.format == 'parquet':
+            types = {'<u4': pyarrow.uint32(), '<f8': pyarrow.float64()}
+            self.schema = pyarrow.schema([(field[0], types[field[1]]) 
+                for field in record_fields])
+            self.file = pyarrow.parquet.ParquetWriter(filename, self.schema)
+            self.rows = []
+        else:
+            raise ValueError(filename + ': unknown format of records.')
+
+    def write(self, row):
+        if self.format == 'npy':
+            self.file.write(row)
+        elif self.format == 'csv':
+            self.csv.writerow(row)
+        else:
+            self.rows.append(row)
+            if len(self.rows) == self.group:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered rows as Parquet row group."""
+        columns = list(zip(*self.rows))
+        self.file.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) 
+                for column, field in zip(columns, self.schema)], 
+            schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.format == 'parquet' and self.rows:
+            self.flush()
+        self.file.close()
+
+def analyze_batch(batch, parse, quantiles, histograms=False, rows=False):
+    """Return the statistics of a batch of records and, if rows is set, the 
+    list of per-record statistics. If parse is given, the batch holds the 
+    lines of an ndjson collection that are parsed with it."""
+    statistics = Statistics(quantiles, histograms)
+    records = [] if rows else None
+    for d in batch:
+        if parse:
+            d = parse(d)
+        stats = analyze_record(d, histograms)
+        statistics.add(stats)
+        if rows:
+            records.append(record_row(stats))
+
+    return statistics, records
+
+def analyze_trees(filename, statistics, records=None):
+    """Add the records of a tree file (see treefile.py) to the statistics and 
+    write their rows with records (see RecordWriter) if given."""
+    kinds = [label_kind(label) for label in read_labels(filename)]
+    fanouts = statistics.histograms is not None
+    for parents, labels in iter_trees(filename):
+        stats = tree_stats(parents, [kinds[l] for l in labels], fanouts)
+        statistics.add(stats)
+        if records:
+            records.write(record_row(stats))
 
 def main():
     parser = ArgumentParser(description='Input parameters for JSON analysis.')
     parser.add_argument('-f', '--filename', type=str, required=True,
-                        help='Filename/-path where the document is stored.')
+                        help='Filename/-path where the document is stored, \
+                        either as JSON (optionally compressed with gzip, xz, \
+                        or zstd) or as tree file (see treefile.py).')
+    parser.add_argument('--ndjson', default=False, action='store_true',
+                        help='The collection stores one JSON document per \
+                        line instead of an array.')
+    parser.add_argument('-q', '--quantiles', default=False,
+                        action='store_true', help='Report quantiles of the \
+                        number of nodes, the depth, and the fanout.')
+    parser.add_argument('--histograms', default=False, action='store_true',
+                        help='Report histograms of the number of nodes and \
+                        the depth per record, and of the fanout of all \
+                        objects and arrays (bins of powers of two).')
+    parser.add_argument('--records', type=str, default='',
+                        help='Filename/-path where the statistics of every \
+                        record are stored, one row per record (see \
+                        jsonstats.record_fields), as .npy, .csv (optionally \
+                        compressed), or .parquet (requires pyarrow).')
+    parser.add_argument('--events', default=False, action='store_true',
+                        help='Analyze the records from parser events without \
+                        building them (see jsonparse.iter_events), for \
+                        records that are too large or too deeply nested to \
+                        be loaded.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of processes that analyze the \
+                        collection (default=1).')
+    parser.add_argument('--batch', type=int, default=1000,
+                        help='Number of records per batch and process when \
+                        running with several jobs (default=1000).')
+    parser.add_argument('--parser', choices=['auto'] + available(), 
+                        default='auto', help='JSON parser of the records, \
+                        the fastest installed one by default (see \
+                        jsonparse.py).')
+    parser.add_argument('--progress', type=float, nargs='?', const=10.0,
+                        default=None, metavar='SECONDS', help='Report the \
+                        progress to stderr every SECONDS (default=10) and the \
+                        time per phase at the end.')
+    parser.add_argument('--profile', type=str, default='',
+                        help='Filename/-path of a cProfile dump of the run \
+                        (see pstats, worker processes are not profiled).')
     args = parser.parse_args()
-    global type_count
-    global depth
-    global object_degree
-    global array_degree
-
-    records = 0
-    nodes = []
-    types = [[],[],[],[]]
-    depth_min = []
-    depth_avg = []
-    depth_max = []
-    obj_deg_min = []
-    obj_deg_avg = []
-    obj_deg_max = []
-    arr_deg_min = []
-    arr_deg_avg = []
-    arr_deg_max = []
-
-    with open(args.filename) as json_file:
-        data = json.load(json_file)
-        records = len(data)
-
-        for d in data:
-            analyze(d, 0)
-
-            nodes.append(sum(type_count))
-            for i in range(len(type_count)):
-                types[i].append(type_count[i])
-
-            # store depth data
-            depth_max.append(len(depth)-1)
-
-            # store object outdegree data
-            obj_deg_min.append(min(object_degree, default=0))
-            if len(object_degree) == 0:
-                obj_deg_avg.append(0)
-            else:
-                obj_deg_avg.append(sum(object_degree)/len(object_degree))
-            obj_deg_max.append(max(object_degree, default=0))
+    if args.records:
+        if not args.records.endswith(('.npy', '.csv', '.csv.gz', '.csv.xz', 
+                '.csv.zst', '.parquet')):
+            parser.error('--records must end with .npy, .csv, or .parquet.')
+        if args.records.endswith('.parquet') and pyarrow is None:
+            parser.error('--records *.parquet requires pyarrow.')
+    tree_file = is_tree_file(args.filename)
+    if tree_file and (args.ndjson or args.jobs > 1):
+        parser.error('tree files are read in a single process, without '
+                '--ndjson and --jobs.')
+    if args.events and (tree_file or args.jobs > 1 or 
+            args.parser != 'auto'):
+        parser.error('--events reads JSON in a single process, without '
+                '--jobs and --parser.')
+    if args.profile:
+        profile(args.profile)
+    loads = get_loads(args.parser)
 
-            # store array outdegree data
-            arr_deg_min.append(min(array_degree, default=0))
-            if len(array_degree) == 0:
-                arr_deg_avg.append(0)
+    statistics = Statistics(args.quantiles, args.histograms)
+    records = RecordWriter(args.records) if args.records else None
+
+    # The records are read and analyzed one at a time. With several jobs, 
+    # batches of records are analyzed in parallel and their statistics are 
+    # merged. The workers parse the records themselves. 
+    # Tree files are read without parsing, hence in a single process, as are 
+    # the parser events of --events. The rows of the records are written in 
+    # the order of the collection.
+    if tree_file:
+        analyze_trees(args.filename, statistics, records)
+    else:
+        with open_file(args.filename) as json_file:
+            progress = Progress(json_file, args.progress) if args.progress \
+                    else None
+            raw = args.jobs > 1
+            if args.events:
+                data = iter_event_stats(iter_events(json_file), args.ndjson, 
+                        args.histograms)
+            else:
+                data = iter_records(json_file, args.ndjson, raw, loads=loads)
+            if progress:
+                data = progress.iterate(data)
+            if args.jobs > 1:
+                with Pool(args.jobs) as pool:
+                    for part, rows in map_batches(pool, analyze_batch, 
+                            data, args.jobs, args.batch, 
+                            loads if raw else None, args.quantiles, 
+                            args.histograms, records is not None):
+                        statistics.merge(part)
+                        if records:
+                            for row in rows:
+                                records.write(row)
+            elif progress or records or args.events:
+                for d in data:
+                    stats = d if args.events else \
+                            analyze_record(d, args.histograms)
+                    statistics.add(stats)
+                    if progress:
+                        progress.lap('traverse')
+                    if records:
+                        records.write(record_row(stats))
+                        if progress:
+                            progress.lap('write')
             else:
-                arr_deg_avg.append(sum(array_degree)/len(array_degree))
-            arr_deg_max.append(max(array_degree, default=0))
-
-            type_count = [0, 0, 0, 0]
-            depth = []
-            object_degree = []
-            array_degree = []
-
-    print("GENERAL INFORMATION:")
-    print("#record: " + str(records))
-    print("#nodes per record: [" + str(min(nodes)) + ", " + str(max(nodes)) + 
-            "]  -  avg = " + str(round(sum(nodes)/len(nodes), 2)))
-    print()
-
-    print("TYPE distribution:")
-    for i in range(len(types)):
-        print(str(type_name[i]) + ": [" + str(min(types[i])) + ", " + 
-                str(max(types[i])) + "]  -  avg = " + 
-                str(round(sum(types[i])/len(types[i]), 2)))
-    print()
-
-    print("DEPTH distribution:")
-    print("maximum: [" + str(min(depth_max)) + ", " + str(max(depth_max)) + 
-            "]  -  avg = " + str(round(sum(depth_max)/len(depth_max), 2)))
-    print()
-
-    print("OUTDEGREE distribution OBJECT:")
-    print("minimum: [" + str(min(obj_deg_min)) + ", " + str(max(obj_deg_min)) + 
-            "]  -  avg = " + str(round(sum(obj_deg_min)/len(obj_deg_min), 2)))
-    print("average: [" + str(round(min(obj_deg_avg), 2)) + ", " + 
-            str(round(max(obj_deg_avg), 2)) + 
-            "]  -  avg = " + str(round(sum(obj_deg_avg)/len(obj_deg_avg), 2)))
-    print("maximum: [" + str(min(obj_deg_max)) + ", " + str(max(obj_deg_max)) + 
-            "]  -  avg = " + str(round(sum(obj_deg_max)/len(obj_deg_max), 2)))
-    print()
-
-    print("OUTDEGREE distribution ARRAY:")
-    print("minimum: [" + str(min(arr_deg_min)) + ", " + str(max(arr_deg_min)) + 
-            "]  -  avg = " + str(round(sum(arr_deg_min)/len(arr_deg_min), 2)))
-    print("average: [" + str(round(min(arr_deg_avg), 2)) + ", " + 
-            str(round(max(arr_deg_avg), 2)) + 
-            "]  -  avg = " + str(round(sum(arr_deg_avg)/len(arr_deg_avg), 2)))
-    print("maximum: [" + str(min(arr_deg_max)) + ", " + str(max(arr_deg_max)) + 
-            "]  -  avg = " + str(round(sum(arr_deg_max)/len(arr_deg_max), 2)))
-    print()
+                for d in data:
+                    statistics.add(analyze_record(d, args.histograms))
+            if progress:
+                progress.close()
+    if records:
+        records.close()
+
+    statistics.report()
 
     return
 
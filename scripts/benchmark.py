@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""benchmark.py: Measures the throughput of the scripts on synthetic 
+collections. The collections are generated by generate-json.py with fixed 
+seeds, such that runs on different versions of the scripts process the same 
+data. Every phase runs as a separate process and is timed together with its 
+peak memory (RSS). The results are saved as JSON and can be compared with 
+the results of an earlier run."""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+from argparse import ArgumentParser
+
+scripts = os.path.dirname(os.path.abspath(__file__))
+
+# Synthetic datasets as options of generate-json.py.
+datasets = {
+    'default': [],
+    'wide': ['--maxofan', '20', '--maxafan', '20', '--maxnest', '3'],
+    'deep': ['--maxofan', '3', '--maxafan', '3', '--maxnest', '10'],
+}
+
+# Phases in the order they run. The conversion writes the input of the 
+# counting, hence generate and convert always run.
+phases = ['generate', 'edits', 'convert', 'analyze', 'count']
+
+def phase_command(phase, data, args):
+    """Return the script and arguments of a phase on the files with the 
+    prefix data, and the file whose size is reported: the input, or the 
+    output for phases that generate data."""
+    generate = ['generate-json.py', '--collection', str(args.records), 
+            '--seed', str(args.seed)] + datasets[os.path.basename(data)]
+    if phase == 'generate':
+        return generate + ['--filename', data + '.json'], data + '.json'
+    if phase == 'edits':
+        return generate + ['--diff', str(args.edits), '--filename', 
+                data + '.pairs'], data + '.pairs'
+    if phase == 'convert':
+        return ['json2bracket.py', '-f', data + '.json', '--ndjson', '-o', 
+                data + '.bracket'], data + '.json'
+    if phase == 'analyze':
+        return ['analyze-json.py', '-f', data + '.json', '--ndjson'], \
+                data + '.json'
+    if phase == 'count':
+        return ['get-query-trees.py', '-i', data + '.bracket', '-q', '3', 
+                '-t', '1'], data + '.bracket'
+
+def run(command):
+    """Run a script and return its wall-clock time in seconds and its peak 
+    RSS in KiB."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 
+        os.path.join(scripts, command[0])] + command[1:], 
+        stdout=subprocess.DEVNULL)
+    pid, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    code = os.waitstatus_to_exitcode(status)
+    if code != 0:
+        raise RuntimeError(' '.join(command) + ' failed with exit code ' + 
+                str(code))
+    # ru_maxrss is given in bytes on macOS and in KiB elsewhere.
+    rss = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    return elapsed, rss
+
+def benchmark(args, workdir):
+    """Run the phases on all datasets and return the results, one entry 
+    per dataset and phase. The minimum time of the repetitions is kept."""
+    results = []
+    for name in args.datasets:
+        data = os.path.join(workdir, name)
+        for phase in phases:
+            if phase not in args.phases and phase not in ('generate', 
+                    'convert'):
+                continue
+            command, measured = phase_command(phase, data, args)
+            repeat = args.repeat if phase in args.phases else 1
+            best = None
+            for r in range(repeat):
+                seconds, rss = run(command)
+                if best is None or seconds < best[0]:
+                    best = (seconds, rss)
+            if phase not in args.phases:
+                continue
+            seconds, rss = best
+            size = os.path.getsize(measured)
+            result = {'dataset': name, 'phase': phase, 
+                'records': args.records, 'bytes': size, 
+                'seconds': round(seconds, 4), 
+                'records_per_s': round(args.records/seconds, 1), 
+                'mb_per_s': round(size/seconds/1e6, 2), 
+                'peak_rss_kb': rss}
+            results.append(result)
+            print(name + "\t" + phase + "\t" + str(result['seconds']) + 
+                    "\t" + str(result['records_per_s']) + "\t" + 
+                    str(result['mb_per_s']) + "\t" + str(rss), flush=True)
+
+    return results
+
+def compare(results, baseline):
+    """Print the speedup of each dataset and phase over the baseline."""
+    base = {(r['dataset'], r['phase']): r for r in baseline['results']}
+    print()
+    print("dataset\tphase\tspeedup\trss ratio")
+    for r in results:
+        b = base.get((r['dataset'], r['phase']))
+        if b is None:
+            continue
+        print(r['dataset'] + "\t" + r['phase'] + "\t" + 
+                str(round(b['seconds']/r['seconds'], 2)) + "\t" + 
+                str(round(r['peak_rss_kb']/max(b['peak_rss_kb'], 1), 2)))
+
+def main():
+    parser = ArgumentParser(description='Input parameters for the benchmark \
+        of the scripts.')
+    parser.add_argument('-n', '--records', type=int, default=10000,
+        help='Number of records per dataset (default=10000).')
+    parser.add_argument('--seed', type=int, default=1,
+        help='Random seed of the datasets (default=1).')
+    parser.add_argument('--edits', type=int, default=5,
+        help='Maximum number of edits per pair of the edits phase \
+        (default=5).')
+    parser.add_argument('-d', '--datasets', nargs='+', default=list(datasets),
+        choices=list(datasets), help='Datasets to run (default=all).')
+    parser.add_argument('-p', '--phases', nargs='+', default=phases,
+        choices=phases, help='Phases to measure (default=all).')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+        help='Number of repetitions per phase, the minimum time is reported \
+        (default=1).')
+    parser.add_argument('-o', '--output', type=str, default='',
+        help='Filename/-path where the results are stored as JSON.')
+    parser.add_argument('-c', '--compare', type=str, default='',
+        help='Filename/-path of the results of an earlier run to compare \
+        with.')
+    parser.add_argument('-w', '--workdir', type=str, default='',
+        help='Directory of the generated files, which are kept (default=a \
+        temporary directory that is removed).')
+    args = parser.parse_args()
+    if args.records < 2:
+        parser.error('--records must be at least 2')
+    if args.seed == 0:
+        parser.error('--seed must not be 0 (random seed)')
+    if args.repeat < 1:
+        parser.error('--repeat must be positive')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print("dataset\tphase\ttime[s]\trecords/s\tMB/s\tpeak RSS[KiB]")
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = benchmark(args, args.workdir)
+    else:
+        workdir = tempfile.mkdtemp(prefix='jedi-benchmark-')
+        try:
+            results = benchmark(args, workdir)
+        finally:
+            shutil.rmtree(workdir)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 
+                'python': platform.python_version(), 
+                'platform': platform.platform(), 
+                'config': {'records': args.records, 'seed': args.seed, 
+                    'edits': args.edits, 'repeat': args.repeat}, 
+                'results': results}, output, indent=2)
+            output.write('\n')
+    if baseline is not None:
+        compare(results, baseline)
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""bracketfile.py: Reading of bracket notation files that store one record 
+(tree) per line, as written by json2bracket.py."""
+
+import os
+import mmap
+import stat
+import struct
+from compressed import compression, open_file
+
+# Entry of the offset index: byte offset of the line of a record and its 
+# number of nodes, little-endian (NumPy dtype [('offset', '<u8'), 
+# ('nodes', '<u4')]).
+index_entry = struct.Struct('<QI')
+
+def iter_lines(filename):
+    """Yield the byte offset and the content (without newline) of each line 
+    of the given file. A regular file is memory mapped, other files (pipes) 
+    and compressed ones (see compressed.py) are read as stream."""
+    if (not stat.S_ISREG(os.stat(filename).st_mode) or 
+            compression(filename)):
+        with open_file(filename, 'rb') as bracket_file:
+            offset = 0
+            for line in bracket_file:
+                yield offset, line[:-1] if line.endswith(b'\n') else line
+                offset += len(line)
+        return
+
+    with open(filename, 'rb') as bracket_file:
+        if os.fstat(bracket_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(bracket_file.fileno(), 0, 
+                access=mmap.ACCESS_READ) as data:
+            find = data.find
+            start = 0
+            end = len(data)
+            while start < end:
+                newline = find(b'\n', start)
+                if newline < 0:
+                    newline = end
+                yield start, data[start:newline]
+                start = newline + 1
+
+def count_nodes(line):
+    """Return the number of nodes of a record in bracket notation (bytes). A 
+    node starts with an unescaped opening brace."""
+    # The first brace opens the root node. Every other brace opens a node 
+    # unless it is escaped.
+    return 1 + line.count(b'{', 1) - line.count(b'\\{')
+
+def iter_node_counts(filename):
+    """Yield the number of nodes of each line of the given bracket file. The 
+    braces of a line are counted at the bytes level."""
+    for offset, line in iter_lines(filename):
+        yield count_nodes(line)
+
+def node_counts(filename):
+    """Return the number of nodes of each record of the given bracket file."""
+    return list(iter_node_counts(filename))
+
+class IndexWriter:
+    """Writes the offset index <filename>.idx of a bracket file, one entry 
+    (offset, nodes) per record. If append is set, the entries are appended 
+    to an existing index."""
+
+    def __init__(self, filename, append=False):
+        self.file = open(filename + '.idx', 'ab' if append else 'wb', 
+                buffering=1 << 20)
+
+    def add(self, offset, nodes):
+        self.file.write(index_entry.pack(offset, nodes))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_index(filename):
+    """Write the offset index of an existing bracket file. Lines that do not 
+    start with a brace, e.g., the header of json2bracket.py -p, are no 
+    records."""
+    with IndexWriter(filename) as index:
+        for offset, line in iter_lines(filename):
+            if line.startswith(b'{'):
+                index.add(offset, count_nodes(line))
+
+def has_index(filename):
+    """Return True if the offset index <filename>.idx exists and belongs to 
+    the bracket file, i.e., its first entry points to the start of the file 
+    and its last entry to the start of the last line, holding the number of 
+    nodes of that line. An index that is left over from an earlier version 
+    of the file fails this check, as does the index of a file with a header 
+    (json2bracket.py -p), whose lines are not all records. Without index, 
+    every line counts as a record."""
+    try:
+        index_size = os.path.getsize(filename + '.idx')
+        if not stat.S_ISREG(os.stat(filename).st_mode):
+            return False
+    except OSError:
+        return False
+    size = os.path.getsize(filename)
+    if index_size % index_entry.size:
+        return False
+    if index_size == 0:
+        return size == 0
+
+    with open(filename + '.idx', 'rb') as index_file:
+        first = index_entry.unpack(index_file.read(index_entry.size))[0]
+        index_file.seek(-index_entry.size, os.SEEK_END)
+        offset, nodes = index_entry.unpack(index_file.read())
+    if first != 0 or offset >= size:
+        return False
+    with open(filename, 'rb') as bracket_file:
+        bracket_file.seek(max(offset - 1, 0))
+        line = bracket_file.read()
+    # The line starts after a newline and is the last one.
+    if offset > 0:
+        if not line.startswith(b'\n'):
+            return False
+        line = line[1:]
+    if line.endswith(b'\n'):
+        line = line[:-1]
+    return (line.startswith(b'{') and b'\n' not in line and 
+            count_nodes(line) == nodes)
+
+def remove_index(filename):
+    """Remove the offset index of a bracket file that is written without 
+    one, such that the index of an earlier version is not used."""
+    if os.path.exists(filename + '.idx'):
+        os.remove(filename + '.idx')
+
+def iter_index_sizes(filename):
+    """Yield the number of nodes of each record from the offset index of the 
+    given bracket file."""
+    with open(filename + '.idx', 'rb') as index_file:
+        for offset, nodes in index_entry.iter_unpack(index_file.read()):
+            yield nodes
+
+def map_file(f):
+    """Return the read-only memory map of an open file (bytes if empty, 
+    since empty files cannot be mapped)."""
+    if os.fstat(f.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class BracketFile:
+    """Random access to the records of a bracket file by its offset index. 
+    Both files are memory mapped, hence a record or a slice of records is 
+    fetched in constant time (plus its length) without reading the file, 
+    e.g., trees[42] or trees[1000:2000]."""
+
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.index_file = open(filename + '.idx', 'rb')
+        self.data = map_file(self.file)
+        self.index = map_file(self.index_file)
+        self.records = len(self.index) // index_entry.size
+
+    def __len__(self):
+        return self.records
+
+    def entry(self, k):
+        """Return the byte offset and the number of nodes of record k."""
+        if k < 0:
+            k += self.records
+        if not 0 <= k < self.records:
+            raise IndexError('record ' + str(k) + ' out of range')
+        return index_entry.unpack_from(self.index, k*index_entry.size)
+
+    def nodes(self, k):
+        """Return the number of nodes of record k."""
+        return self.entry(k)[1]
+
+    def end(self, offset):
+        """Return the end of the line starting at offset."""
+        newline = self.data.find(b'\n', offset)
+        return newline if newline >= 0 else len(self.data)
+
+    def __getitem__(self, k):
+        """Return record k, or the list of records of a slice, in bracket 
+        notation."""
+        if isinstance(k, slice):
+            start, stop, step = k.indices(self.records)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            first = self.entry(start)[0]
+            last = self.entry(stop - 1)[0]
+            return self.data[first:self.end(last)].decode().split('\n')
+        offset = self.entry(k)[0]
+        return self.data[offset:self.end(offset)].decode()
+
+    def close(self):
+        for m in (self.data, self.index):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
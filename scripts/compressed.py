@@ -0,0 +1,172 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""compressed.py: Transparent reading and writing of compressed files. Input 
+files compressed with gzip, xz, or zstd are recognized by their magic 
+number, output files by the suffix of their name (.gz, .xz, .zst). The data 
+is (de)compressed in chunks while it is read or written, nothing is 
+decompressed to disk. Files are opened only once, such that pipes are read 
+as well. zstd requires the zstandard package."""
+
+import io
+import os
+import gzip
+import lzma
+try:
+    import zstandard
+except ImportError: # Only needed for zstd files.
+    zstandard = None
+
+# Magic numbers of the compressed formats.
+magic = [(b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'), 
+         (b'\x28\xb5\x2f\xfd', 'zstd')]
+suffixes = {'.gz': 'gzip', '.xz': 'xz', '.zst': 'zstd'}
+
+def detect(head):
+    """Return the compression format of a file starting with the bytes head, 
+    or None."""
+    for number, format in magic:
+        if head.startswith(number):
+            return format
+    return None
+
+def compression(filename):
+    """Return the compression format of an existing regular file, or None. 
+    Pipes lose the bytes read here, hence they are only detected by 
+    open_file."""
+    with open(filename, 'rb') as f:
+        return detect(f.read(6))
+
+def output_compression(filename):
+    """Return the compression format of an output file by its suffix, or 
+    None."""
+    return suffixes.get(os.path.splitext(filename)[1])
+
+class GzipReader(gzip.GzipFile):
+    """Decompresses a gzip file given as open binary file, which is closed 
+    with the reader."""
+
+    def __init__(self, file):
+        super().__init__(fileobj=file, mode='rb')
+        self.file = file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.file.close()
+
+class XzReader(lzma.LZMAFile):
+    """Decompresses an xz file given as open binary file, which is closed 
+    with the reader."""
+
+    def __init__(self, file):
+        super().__init__(file, 'rb')
+        self.file = file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.file.close()
+
+class ZstdReader(io.RawIOBase):
+    """Decompresses a zstd file given as open binary file while it is read. 
+    Seeking to the start restarts the decompression, as gzip and lzma files 
+    do."""
+
+    def __init__(self, file):
+        if zstandard is None:
+            file.close()
+            raise ValueError(file.name + ': zstd requires the zstandard '
+                    'package.')
+        self.file = file
+        self.reader = zstandard.ZstdDecompressor().stream_reader(file)
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.reader.read(len(b))
+        b[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR and offset == 0:
+            return self.pos
+        if whence != io.SEEK_SET or offset != 0:
+            raise io.UnsupportedOperation('zstd files only seek to the start')
+        self.file.seek(0)
+        self.reader = zstandard.ZstdDecompressor().stream_reader(self.file)
+        self.pos = 0
+        return 0
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+def open_file(filename, mode='r', buffering=1 << 20):
+    """Open a file like open(filename, mode), but decompress it if it is 
+    read (mode 'r' or 'rb') and compressed, and compress it if it is written 
+    (mode 'w', 'wb', 'a', or 'ab') and its name has a compression suffix."""
+    binary = 'b' in mode
+    if mode[0] == 'r':
+        # The format is taken from the buffer of the file, which keeps the 
+        # bytes of pipes.
+        f = open(filename, 'rb', buffering=buffering)
+        format = detect(f.peek(6)[:6])
+        if format == 'gzip':
+            f = GzipReader(f)
+        elif format == 'xz':
+            f = XzReader(f)
+        elif format == 'zstd':
+            f = io.BufferedReader(ZstdReader(f), buffering)
+        if binary:
+            return f
+        return io.TextIOWrapper(f)
+
+    format = output_compression(filename)
+    if format is None:
+        return open(filename, mode, buffering=buffering)
+
+    mode = mode.replace('t', '').replace('b', '')
+    if format == 'gzip':
+        # Level 6 is much faster than the default 9 at almost the same size.
+        f = gzip.open(filename, mode + 'b', compresslevel=6)
+    elif format == 'xz':
+        f = lzma.open(filename, mode + 'b')
+    elif zstandard is None:
+        raise ValueError(filename + ': zstd requires the zstandard package.')
+    else:
+        f = zstandard.open(filename, mode + 'b')
+    if binary:
+        return f
+    return io.TextIOWrapper(f)
@@ -24,14 +24,14 @@
 # The raw JSON datasets are fetched from repositories (see directory `raw-data`)
 # and converted into bracket notation which serves as the input data for the
 # algorithms (see directory `input-data`). Further, the characteristics of the
-# datasets are analyzed.
+# datasets are analyzed (see directory `analysis`).
 
 start_time=$SECONDS
 echo "This process takes approximately one hour for all datasets. One might 
 consider to exclude datasets that are not needed."
 
 # Create raw data directory in case it does not exist.
-echo "Download raw data (1/3)"
+echo "Download raw data (1/2)"
 mkdir -p raw-data
 cd raw-data
 
@@ -62,7 +62,7 @@ git clone https://frosch.cosy.sbg.ac.at/datasets/json/twitter2.git
 git clone https://frosch.cosy.sbg.ac.at/datasets/json/virus.git
 
 # Create input data directories in case they do not exist.
-echo "Prepare input data (2/3)"
+echo "Prepare and analyze input data (2/2)"
 cd ..
 mkdir -p input-data/arxiv
 mkdir -p input-data/cards
@@ -88,151 +88,81 @@ mkdir -p input-data/trees
 mkdir -p input-data/twitter2
 mkdir -p input-data/virus
 
-# Convert the raw JSON data into the bracket notation input data format. Sort 
-# the sibling order to apply the JediOrder upper bound on ordered siblings.
+# Convert the raw JSON data into the bracket notation input data format and 
+# analyze the characteristics of the datasets in a single pass. Sort the 
+# sibling order to apply the JediOrder upper bound on ordered siblings. The 
+# number of nodes per record is stored for the selection of query trees. 
+# Datasets that did not change since the last run are skipped, and only the 
+# appended records of a grown dataset are processed (--cache).
+mkdir -p analysis/
 echo " * Processing arxiv ...\c"
-python3 scripts/json2bracket.py -f raw-data/arxiv/arxiv.json -c -s > input-data/arxiv/arxiv.bracket
+python3 scripts/preprocess-json.py -f raw-data/arxiv/arxiv.json -s -o input-data/arxiv/arxiv.bracket -a analysis/arxiv.txt --sizes input-data/arxiv/arxiv.sizes --index --features input-data/arxiv/arxiv.features.npy --cache
 echo " Done"
 echo " * Processing cards ...\c"
-python3 scripts/json2bracket.py -f raw-data/cards/cards.json -c -s > input-data/cards/cards.bracket
+python3 scripts/preprocess-json.py -f raw-data/cards/cards.json -s -o input-data/cards/cards.bracket -a analysis/cards.txt --sizes input-data/cards/cards.sizes --index --features input-data/cards/cards.features.npy --cache
 echo " Done"
 echo " * Processing clothing ...\c"
-python3 scripts/json2bracket.py -f raw-data/clothing/clothing.json -c -s > input-data/clothing/clothing.bracket
+python3 scripts/preprocess-json.py -f raw-data/clothing/clothing.json -s -o input-data/clothing/clothing.bracket -a analysis/clothing.txt --sizes input-data/clothing/clothing.sizes --index --features input-data/clothing/clothing.features.npy --cache
 echo " Done"
 echo " * Processing dblp ...\c"
-python3 scripts/json2bracket.py -f raw-data/dblp/dblp.json -c -s > input-data/dblp/dblp.bracket
+python3 scripts/preprocess-json.py -f raw-data/dblp/dblp.json -s -o input-data/dblp/dblp.bracket -a analysis/dblp.txt --sizes input-data/dblp/dblp.sizes --index --features input-data/dblp/dblp.features.npy --cache
 echo " Done"
 echo " * Processing denf ...\c"
-python3 scripts/json2bracket.py -f raw-data/denf/denf.json -c -s > input-data/denf/denf.bracket
+python3 scripts/preprocess-json.py -f raw-data/denf/denf.json -s -o input-data/denf/denf.bracket -a analysis/denf.txt --sizes input-data/denf/denf.sizes --index --features input-data/denf/denf.features.npy --cache
 echo " Done"
 echo " * Processing device ...\c"
-python3 scripts/json2bracket.py -f raw-data/device/device.json -c -s > input-data/device/device.bracket
+python3 scripts/preprocess-json.py -f raw-data/device/device.json -s -o input-data/device/device.bracket -a analysis/device.txt --sizes input-data/device/device.sizes --index --features input-data/device/device.features.npy --cache
 echo " Done"
 echo " * Processing face ...\c"
-python3 scripts/json2bracket.py -f raw-data/face/face.json -c -s > input-data/face/face.bracket
+python3 scripts/preprocess-json.py -f raw-data/face/face.json -s -o input-data/face/face.bracket -a analysis/face.txt --sizes input-data/face/face.sizes --index --features input-data/face/face.features.npy --cache
 echo " Done"
 echo " * Processing fenf ...\c"
-python3 scripts/json2bracket.py -f raw-data/fenf/fenf.json -c -s > input-data/fenf/fenf.bracket
+python3 scripts/preprocess-json.py -f raw-data/fenf/fenf.json -s -o input-data/fenf/fenf.bracket -a analysis/fenf.txt --sizes input-data/fenf/fenf.sizes --index --features input-data/fenf/fenf.features.npy --cache
 echo " Done"
 echo " * Processing movies ...\c"
-python3 scripts/json2bracket.py -f raw-data/movies/movies.json -c -s > input-data/movies/movies.bracket
+python3 scripts/preprocess-json.py -f raw-data/movies/movies.json -s -o input-data/movies/movies.bracket -a analysis/movies.txt --sizes input-data/movies/movies.sizes --index --features input-data/movies/movies.features.npy --cache
 echo " Done"
 echo " * Processing nasa ...\c"
-python3 scripts/json2bracket.py -f raw-data/nasa/nasa.json -c -s > input-data/nasa/nasa.bracket
+python3 scripts/preprocess-json.py -f raw-data/nasa/nasa.json -s -o input-data/nasa/nasa.bracket -a analysis/nasa.txt --sizes input-data/nasa/nasa.sizes --index --features input-data/nasa/nasa.features.npy --cache
 echo " Done"
 echo " * Processing nba ...\c"
-python3 scripts/json2bracket.py -f raw-data/nba/nba.json -c -s > input-data/nba/nba.bracket
+python3 scripts/preprocess-json.py -f raw-data/nba/nba.json -s -o input-data/nba/nba.bracket -a analysis/nba.txt --sizes input-data/nba/nba.sizes --index --features input-data/nba/nba.features.npy --cache
 echo " Done"
 echo " * Processing reads ...\c"
-python3 scripts/json2bracket.py -f raw-data/reads/reads.json -c -s > input-data/reads/reads.bracket
+python3 scripts/preprocess-json.py -f raw-data/reads/reads.json -s -o input-data/reads/reads.bracket -a analysis/reads.txt --sizes input-data/reads/reads.sizes --index --features input-data/reads/reads.features.npy --cache
 echo " Done"
 echo " * Processing recipes ...\c"
-python3 scripts/json2bracket.py -f raw-data/recipes/recipes.json -c -s > input-data/recipes/recipes.bracket
+python3 scripts/preprocess-json.py -f raw-data/recipes/recipes.json -s -o input-data/recipes/recipes.bracket -a analysis/recipes.txt --sizes input-data/recipes/recipes.sizes --index --features input-data/recipes/recipes.features.npy --cache
 echo " Done"
 echo " * Processing reddit ...\c"
-python3 scripts/json2bracket.py -f raw-data/reddit/reddit.json -c -s > input-data/reddit/reddit.bracket
+python3 scripts/preprocess-json.py -f raw-data/reddit/reddit.json -s -o input-data/reddit/reddit.bracket -a analysis/reddit.txt --sizes input-data/reddit/reddit.sizes --index --features input-data/reddit/reddit.features.npy --cache
 echo " Done"
 echo " * Processing schema ...\c"
-python3 scripts/json2bracket.py -f raw-data/schema/schema.json -c -s > input-data/schema/schema.bracket
+python3 scripts/preprocess-json.py -f raw-data/schema/schema.json -s -o input-data/schema/schema.bracket -a analysis/schema.txt --sizes input-data/schema/schema.sizes --index --features input-data/schema/schema.features.npy --cache
 echo " Done"
 echo " * Processing smsen ...\c"
-python3 scripts/json2bracket.py -f raw-data/smsen/smsen.json -c -s > input-data/smsen/smsen.bracket
+python3 scripts/preprocess-json.py -f raw-data/smsen/smsen.json -s -o input-data/smsen/smsen.bracket -a analysis/smsen.txt --sizes input-data/smsen/smsen.sizes --index --features input-data/smsen/smsen.features.npy --cache
 echo " Done"
 echo " * Processing smszh ...\c"
-python3 scripts/json2bracket.py -f raw-data/smszh/smszh.json -c -s > input-data/smszh/smszh.bracket
+python3 scripts/preprocess-json.py -f raw-data/smszh/smszh.json -s -o input-data/smszh/smszh.bracket -a analysis/smszh.txt --sizes input-data/smszh/smszh.sizes --index --features input-data/smszh/smszh.features.npy --cache
 echo " Done"
 echo " * Processing spotify ...\c"
-python3 scripts/json2bracket.py -f raw-data/spotify/spotify.json -c -s > input-data/spotify/spotify.bracket
+python3 scripts/preprocess-json.py -f raw-data/spotify/spotify.json -s -o input-data/spotify/spotify.bracket -a analysis/spotify.txt --sizes input-data/spotify/spotify.sizes --index --features input-data/spotify/spotify.features.npy --cache
 echo " Done"
 echo " * Processing standev ...\c"
-python3 scripts/json2bracket.py -f raw-data/standev/standev.json -c -s > input-data/standev/standev.bracket
+python3 scripts/preprocess-json.py -f raw-data/standev/standev.json -s -o input-data/standev/standev.bracket -a analysis/standev.txt --sizes input-data/standev/standev.sizes --index --features input-data/standev/standev.features.npy --cache
 echo " Done"
 echo " * Processing stantrain ...\c"
-python3 scripts/json2bracket.py -f raw-data/stantrain/stantrain.json -c -s > input-data/stantrain/stantrain.bracket
+python3 scripts/preprocess-json.py -f raw-data/stantrain/stantrain.json -s -o input-data/stantrain/stantrain.bracket -a analysis/stantrain.txt --sizes input-data/stantrain/stantrain.sizes --index --features input-data/stantrain/stantrain.features.npy --cache
 echo " Done"
 echo " * Processing trees ...\c"
-python3 scripts/json2bracket.py -f raw-data/trees/trees.json -c -s > input-data/trees/trees.bracket
+python3 scripts/preprocess-json.py -f raw-data/trees/trees.json -s -o input-data/trees/trees.bracket -a analysis/trees.txt --sizes input-data/trees/trees.sizes --index --features input-data/trees/trees.features.npy --cache
 echo " Done"
 echo " * Processing twitter2 ...\c"
-python3 scripts/json2bracket.py -f raw-data/twitter2/twitter2.json -c -s > input-data/twitter2/twitter2.bracket
+python3 scripts/preprocess-json.py -f raw-data/twitter2/twitter2.json -s -o input-data/twitter2/twitter2.bracket -a analysis/twitter2.txt --sizes input-data/twitter2/twitter2.sizes --index --features input-data/twitter2/twitter2.features.npy --cache
 echo " Done"
 echo " * Processing virus ...\c"
-python3 scripts/json2bracket.py -f raw-data/virus/virus.json -c -s > input-data/virus/virus.bracket
-echo " Done"
-
-# Create input data directories in case they do not exist.
-echo "Analyze data (3/3)"
-mkdir -p analysis/
-
-# Analyze datasets.
-echo " * Analyze arxiv ...\c"
-python3 scripts/analyze-json.py -f raw-data/arxiv/arxiv.json > analysis/arxiv.txt
-echo " Done"
-echo " * Analyze cards ...\c"
-python3 scripts/analyze-json.py -f raw-data/cards/cards.json > analysis/cards.txt
-echo " Done"
-echo " * Analyze clothing ...\c"
-python3 scripts/analyze-json.py -f raw-data/clothing/clothing.json > analysis/clothing.txt
-echo " Done"
-echo " * Analyze dblp ...\c"
-python3 scripts/analyze-json.py -f raw-data/dblp/dblp.json > analysis/dblp.txt
-echo " Done"
-echo " * Analyze denf ...\c"
-python3 scripts/analyze-json.py -f raw-data/denf/denf.json > analysis/denf.txt
-echo " Done"
-echo " * Analyze device ...\c"
-python3 scripts/analyze-json.py -f raw-data/device/device.json > analysis/device.txt
-echo " Done"
-echo " * Analyze face ...\c"
-python3 scripts/analyze-json.py -f raw-data/face/face.json > analysis/face.txt
-echo " Done"
-echo " * Analyze fenf ...\c"
-python3 scripts/analyze-json.py -f raw-data/fenf/fenf.json > analysis/fenf.txt
-echo " Done"
-echo " * Analyze movies ...\c"
-python3 scripts/analyze-json.py -f raw-data/movies/movies.json > analysis/movies.txt
-echo " Done"
-echo " * Analyze nasa ...\c"
-python3 scripts/analyze-json.py -f raw-data/nasa/nasa.json > analysis/nasa.txt
-echo " Done"
-echo " * Analyze nba ...\c"
-python3 scripts/analyze-json.py -f raw-data/nba/nba.json > analysis/nba.txt
-echo " Done"
-echo " * Analyze reads ...\c"
-python3 scripts/analyze-json.py -f raw-data/reads/reads.json > analysis/reads.txt
-echo " Done"
-echo " * Analyze recipes ...\c"
-python3 scripts/analyze-json.py -f raw-data/recipes/recipes.json > analysis/recipes.txt
-echo " Done"
-echo " * Analyze reddit ...\c"
-python3 scripts/analyze-json.py -f raw-data/reddit/reddit.json > analysis/reddit.txt
-echo " Done"
-echo " * Analyze schema ...\c"
-python3 scripts/analyze-json.py -f raw-data/schema/schema.json > analysis/schema.txt
-echo " Done"
-echo " * Analyze smsen ...\c"
-python3 scripts/analyze-json.py -f raw-data/smsen/smsen.json > analysis/smsen.txt
-echo " Done"
-echo " * Analyze smszh ...\c"
-python3 scripts/analyze-json.py -f raw-data/smszh/smszh.json > analysis/smszh.txt
-echo " Done"
-echo " * Analyze spotify ...\c"
-python3 scripts/analyze-json.py -f raw-data/spotify/spotify.json > analysis/spotify.txt
-echo " Done"
-echo " * Analyze standev ...\c"
-python3 scripts/analyze-json.py -f raw-data/standev/standev.json > analysis/standev.txt
-echo " Done"
-echo " * Analyze stantrain ...\c"
-python3 scripts/analyze-json.py -f raw-data/stantrain/stantrain.json > analysis/stantrain.txt
-echo " Done"
-echo " * Analyze trees ...\c"
-python3 scripts/analyze-json.py -f raw-data/trees/trees.json > analysis/trees.txt
-echo " Done"
-echo " * Analyze twitter2 ...\c"
-python3 scripts/analyze-json.py -f raw-data/twitter2/twitter2.json > analysis/twitter2.txt
-echo " Done"
-echo " * Analyze virus ...\c"
-python3 scripts/analyze-json.py -f raw-data/virus/virus.json > analysis/virus.txt
+python3 scripts/preprocess-json.py -f raw-data/virus/virus.json -s -o input-data/virus/virus.bracket -a analysis/virus.txt --sizes input-data/virus/virus.sizes --index --features input-data/virus/virus.features.npy --cache
 echo " Done"
 
 elapsed=$(( SECONDS - start_time ))
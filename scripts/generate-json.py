@@ -33,6 +33,38 @@ import sys
 import json
 import random
 import string
+import io
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from jsontree import walk, tree_size, map_batches, OBJECT, ARRAY, KEY, ORDER
+from pairfile import format_pair
+from compressed import open_file
+try:
+    import numpy as np
+except ImportError: # Only needed for --batch.
+    np = None
+
+# Number of records that are generated at once.
+block_size = 1000
+
+# Operation codes of the edit script (see perform_edit). The node is the 
+# preorder number of the edited node in the original document.
+#
+# Code  | Node        | Edit
+# ------+-------------+---------------------------------------------
+# A.1   | object      | insert a key-value pair
+# A.2   | object      | delete a key-value pair
+# A.3   | object      | rename a key
+# A.3.1 | object      | nest the value of a key in an object
+# A.3.2 | object      | nest the value of a key in an array
+# B.1   | array       | insert a value
+# B.2   | array       | delete a value
+# B.3   | array       | exchange the order of two values
+# C.1   | value       | change the value
+# D.1.1 | key         | nest the value in an object
+# D.1.2 | key         | nest the value in an array
+# E.1.1 | array order | nest the value in an object
+# E.1.2 | array order | nest the value in an array
 
 # JSON         | Python
 # -------------+--------
@@ -51,211 +83,261 @@ def random_string(string_length=10):
     return ''.join(random.choice(letters) for i in range(string_length))
 
 def get_size_json(doc):
-    """Returns the size of the corresponding tree of the given JSON."""
-
-    size = 0
-    if isinstance(doc, dict): # OBJECT
-        # Count the node of the object and all its keys.
-        size += 1 + len(doc.keys())
-        # Add the sizes of all values.
-        for key, val in doc.items():
-            size += get_size_json(val)
-    elif isinstance(doc, list): # ARRAY
-        # Count the node of the array and all its array order nodes.
-        size += 1 + len(doc)
-        # Add the sizes of all values.
-        for val in doc:
-            size += get_size_json(val)
-    else: # VALUE
-        # Add node for the value.
-        size += 1
-
-    return size
-
-
-def perform_edit(doc, nr):
+    """Returns the size of the corresponding tree of the given JSON. Objects 
+    count a node per key and arrays a node per array order node."""
+
+    return tree_size(doc, order_nodes=True)
+
+
+class EditIndex:
+    """Index of the nodes of a document in preorder (keys and array order 
+    nodes included, see get_size_json) with the size of their subtrees. 
+
+    The document is numbered once. Edits only change the subtree of their 
+    target node, hence the entries of all nodes with smaller numbers stay 
+    valid if the edits are performed in descending order of the node 
+    numbers (see modify_json). Changes of the subtree sizes are propagated 
+    to the ancestors of an edited node."""
+
+    def __init__(self, doc):
+        # Per node: its type, the tuple (node, parent, slot) of jsontree.walk, 
+        # the number of its parent, its subtree size, and the numbers of its 
+        # children (by key for objects, by position for arrays).
+        self.kind = []
+        self.target = []
+        self.up = []
+        self.size = []
+        self.children = []
+        ancestors = []
+
+        def enter(kind, node, parent, slot, level):
+            nr = len(self.kind)
+            up = ancestors[-1] if ancestors else -1
+            self.kind.append(kind)
+            self.target.append((node, parent, slot))
+            self.up.append(up)
+            self.size.append(1)
+            self.children.append({} if kind == OBJECT else [] 
+                if kind == ARRAY else None)
+            if up >= 0:
+                siblings = self.children[up]
+                if type(siblings) is dict:
+                    siblings[slot] = nr
+                elif siblings is not None:
+                    siblings.append(nr)
+            ancestors.append(nr)
+
+        def leave(kind, node, parent, slot, level):
+            nr = ancestors.pop()
+            self.size[nr] = len(self.kind) - nr
+
+        walk(doc, enter, leave, order_nodes=True)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def find(self, nr):
+        """Return the node with number nr as tuple (kind, node, parent, slot), 
+        or None if the document has less nodes."""
+        if nr >= len(self.kind):
+            return None
+        return (self.kind[nr],) + self.target[nr]
+
+    def resize(self, nr, delta):
+        """Add delta to the subtree size of node nr and its ancestors."""
+        size = self.size
+        up = self.up
+        while nr >= 0:
+            size[nr] += delta
+            nr = up[nr]
+
+
+def perform_edit(doc, nr, index=None, script=None):
     """Given a JSON document doc, this function performs a random edit 
-    operation at a certain node with a given number nr."""
+    operation at a certain node with a given number nr. The node is looked 
+    up in the given EditIndex of doc, which is updated by the edit. If a 
+    list script is given, the edit is appended as (operation, nr, cost)."""
 
     # Count the cost of the performed edit operation.
     cost = 0
+    # Operation code of the performed edit (see the table above).
+    op = None
+
+    # Find the target node in the index. The target node can either be an 
+    # object, a key, an array, an array order node, or a value.
+    if index is None:
+        index = EditIndex(doc)
+    target = index.find(nr)
+    if target is None:
+        return doc, cost
+    kind, node, parent, slot = target
 
-    # The given JSON document can either be an object, an array, or a value.
     ### OBJECT
-    if isinstance(doc, dict):
-        # If nr is 0, the target node has been found.
-        if nr == 0:
-            max_edit = 2
-            # If the object is empty, allow only insert operations.
-            if len(doc.keys()) == 0:
-                max_edit = 0
-            # Randomly choose edit operation.
-            edit = random.randint(0, max_edit)
-
-            # Perform chosen edit operation.
-            ### Insert a key-value pair.
-            if edit == 0:
-                key = random_string(random.randint(1, 10))
-                value = generate_json(0, 3, 0, 4, 0, 3)
-                # Random (small) values to generate a new JSON value for the 
-                # new key.
-                doc[key] = value
-                # Cost for inserting a key and its value.
-                cost += 1 + get_size_json(value)
-                print("  A.1 insert key-value pair with key " + str(key) + 
-                    " and value " + str(value) + "; cost=" + 
-                    str(1 + get_size_json(value)))
-            ### Delete a key-value pair.
-            elif edit == 1:
-                key = random.choice(list(doc.keys()))
-                c = 1 + get_size_json(doc[key])
-                value = doc.pop(key)
-                cost += 1
-                print("  A.2 delete key-value pair with key " + str(key) + 
-                    " and value " + str(value)  + "; cost=1")
-            ### Rename a key.
-            elif edit == 2:
-                old_key = random.choice(list(doc.keys()))
-                new_key = random_string(random.randint(1, 10))
-                doc[new_key] = doc.pop(old_key)
+    if kind == OBJECT:
+        max_edit = 2
+        # If the object is empty, allow only insert operations.
+        if len(node.keys()) == 0:
+            max_edit = 0
+        # Randomly choose edit operation.
+        edit = random.randint(0, max_edit)
+
+        # Perform chosen edit operation.
+        ### Insert a key-value pair.
+        if edit == 0:
+            key = random_string(random.randint(1, 10))
+            value = generate_json(0, 3, 0, 4, 0, 3)
+            # Random (small) values to generate a new JSON value for the 
+            # new key. An existing key with the same name loses its value.
+            delta = 1 + get_size_json(value)
+            if key in node:
+                delta -= index.size[index.children[nr][key]]
+            node[key] = value
+            index.resize(nr, delta)
+            # Cost for inserting a key and its value.
+            cost += 1 + get_size_json(value)
+            op = "A.1"
+        ### Delete a key-value pair.
+        elif edit == 1:
+            key = random.choice(list(node.keys()))
+            value = node.pop(key)
+            index.resize(nr, -index.size[index.children[nr][key]])
+            cost += 1
+            op = "A.2"
+        ### Rename a key.
+        elif edit == 2:
+            old_key = random.choice(list(node.keys()))
+            new_key = random_string(random.randint(1, 10))
+            # An existing key with the new name loses its value.
+            if new_key != old_key and new_key in node:
+                index.resize(nr, -index.size[index.children[nr][new_key]])
+            node[new_key] = node.pop(old_key)
+            cost += 1
+            op = "A.3"
+        ### Nest a child by one level (object or array).
+        elif edit == 3:
+            # Randomly chose a key where the object is nested at.
+            key = random.choice(list(node.keys()))
+            value = node[key]
+            # Both nestings add two nodes.
+            index.resize(index.children[nr][key], 2)
+            # Decide whether to nest with an array or an object.
+            nest = random.randint(0, 1)
+            if nest == 0: # NEST IN OBJECT
+                obj = {}
+                obj[random_string(random.randint(1, 10))] = value
+                node[key] = obj
+                cost += 2
+                op = "A.3.1"
+            elif nest == 1: # NEST IN ARRAY
+                node[key] = [value]
                 cost += 1
-                print("  A.3 rename key from " + str(old_key) + " to " + 
-                    str(new_key) + "; cost=1")
-            ### Nest a child by one level (object or array).
-            elif edit == 3:
-                # Randomly chose a key where the object is nested at.
-                key = random.choice(list(doc.keys()))
-                value = doc[key]
-                # Decide whether to nest with an array or an object.
-                nest = random.randint(0, 1)
-                if nest == 0: # NEST IN OBJECT
-                    obj = {}
-                    obj[random_string(random.randint(1, 10))] = value
-                    doc[key] = obj
-                    cost += 2
-                    print("  A.3.1 object value " + str(value) + 
-                        " is nested in object; cost=2")
-                elif nest == 1: # NEST IN ARRAY
-                    doc[key] = [value]
-                    cost += 1
-                    print("  A.3.2 object value " + str(value) + 
-                        " is nested in array; cost=1")
-        # If nr is greater than 0, recursively look for the target node.
-        # Or edit key.
-        else:
-            nr -= 1
-            for key, val in doc.items():
-                ### Nest the value of this key by one level (object or array).
-                if nr == 0:
-                    # Randomly chose a key where the object is nested at.
-                    value = doc[key]
-                    # Decide whether to nest with an array or an object.
-                    nest = random.randint(0, 1)
-                    if nest == 0: # NEST IN OBJECT
-                        obj = {}
-                        obj[random_string(random.randint(1, 10))] = value
-                        doc[key] = obj
-                        cost += 2
-                        print("  D.1.1 object value " + str(value) + 
-                            " is nested in object; cost=2")
-                    elif nest == 1: # NEST IN ARRAY
-                        doc[key] = [value]
-                        cost += 1
-                        print("  D.1.2 object value " + str(value) + 
-                            " is nested in array; cost=1")
-                    break
-                else:
-                    nr -= 1 # Remove number for key.
-                    doc[key], c = perform_edit(val, nr)
-                    cost += c
-                    nr -= get_size_json(doc[key])
-    
+                op = "A.3.2"
+
+    ### KEY: Nest the value of this key by one level (object or array).
+    elif kind == KEY:
+        value = parent[slot]
+        # Both nestings add two nodes.
+        index.resize(nr, 2)
+        # Decide whether to nest with an array or an object.
+        nest = random.randint(0, 1)
+        if nest == 0: # NEST IN OBJECT
+            obj = {}
+            obj[random_string(random.randint(1, 10))] = value
+            parent[slot] = obj
+            cost += 2
+            op = "D.1.1"
+        elif nest == 1: # NEST IN ARRAY
+            parent[slot] = [value]
+            cost += 1
+            op = "D.1.2"
+
     ### ARRAY
-    elif isinstance(doc, list):
-        if nr == 0:
-            max_edit = 3
-            # If the array is empty, insert a value.
-            if len(doc) == 0:
-                max_edit = 0
-            # If the array size is one, the order cannot be exchanged.
-            elif len(doc) == 1:
-                max_edit = 2
-            edit = random.randint(0, max_edit)
-
-            ### Insert value.
-            if edit == 0:
-                value = generate_json(0, 3, 0, 4, 0, 3)
-                pos = random.randint(0, len(doc))
-                doc.insert(pos, value)
-                cost += get_size_json(value)
-                print("  B.1 add value " + str(value) + " at position " + 
-                    str(pos) + "; cost=" + str(get_size_json(value)))
-            ### Delete value.
-            elif edit == 1:
-                pos = random.randint(0, len(doc)-1)
-                # The costs are deleting the array order node and the value.
-                c = 1 + get_size_json(doc[pos])
-                cost += c
-                doc.pop(pos)
-                print("  B.2 delete value at position " + str(pos) + 
-                    "; cost=" + str(c))
-            elif edit == 2: # change order
-                exchange = random.sample(range(len(doc)), 2)
-                temp = doc[exchange[0]]
-                doc[exchange[0]] = doc[exchange[1]]
-                doc[exchange[1]] = temp
-                cost += 2
-                print("  B.3 exchange order; " + str(exchange[0]) + " to " + 
-                    str(exchange[1]) + "; cost=2")
-        else: # Otherwise, find node recursively.
-            nr -= 1
-            for eid in range(len(doc)):
-                ### Nest this value by one level (object or array).
-                if nr == 0:
-                    value = doc[eid]
-                    # Decide whether to nest with an array or an object.
-                    nest = random.randint(0, 1)
-                    if nest == 0: # NEST IN OBJECT
-                        obj = {}
-                        obj[random_string(random.randint(1, 10))] = value
-                        doc[eid] = obj
-                        cost += 2
-                        print("  E.1.1 array value " + str(value) + 
-                            " is nested in object; cost=2")
-                    elif nest == 1: # NEST IN ARRAY
-                        doc[eid] = [value]
-                        cost += 1
-                        print("  E.1.2 array value " + str(value) + 
-                            " is nested in array; cost=1")
-                    break
-                else:
-                    nr -= 1 # Remove number for array order node.
-                    doc[eid], c = perform_edit(doc[eid], nr)
-                    cost += c
-                    nr -= get_size_json(doc[eid])
-    
+    elif kind == ARRAY:
+        max_edit = 3
+        # If the array is empty, insert a value.
+        if len(node) == 0:
+            max_edit = 0
+        # If the array size is one, the order cannot be exchanged. The edit is 
+        # drawn again in this case, which keeps the random numbers of all 
+        # other edits unchanged.
+        elif len(node) == 1:
+            max_edit = 2
+        edit = random.randint(0, max_edit)
+        if edit == 2 and len(node) == 1:
+            edit = random.randint(0, 1)
+
+        ### Insert value.
+        if edit == 0:
+            value = generate_json(0, 3, 0, 4, 0, 3)
+            pos = random.randint(0, len(node))
+            node.insert(pos, value)
+            # The value is inserted with its array order node.
+            index.resize(nr, 1 + get_size_json(value))
+            cost += get_size_json(value)
+            op = "B.1"
+        ### Delete value.
+        elif edit == 1:
+            pos = random.randint(0, len(node)-1)
+            # The costs are deleting the array order node and the value.
+            c = index.size[index.children[nr][pos]]
+            index.resize(nr, -c)
+            cost += c
+            node.pop(pos)
+            op = "B.2"
+        elif edit == 2: # change order
+            exchange = random.sample(range(len(node)), 2)
+            temp = node[exchange[0]]
+            node[exchange[0]] = node[exchange[1]]
+            node[exchange[1]] = temp
+            cost += 2
+            op = "B.3"
+
+    ### ARRAY ORDER: Nest this value by one level (object or array).
+    elif kind == ORDER:
+        value = parent[slot]
+        # Both nestings add two nodes.
+        index.resize(nr, 2)
+        # Decide whether to nest with an array or an object.
+        nest = random.randint(0, 1)
+        if nest == 0: # NEST IN OBJECT
+            obj = {}
+            obj[random_string(random.randint(1, 10))] = value
+            parent[slot] = obj
+            cost += 2
+            op = "E.1.1"
+        elif nest == 1: # NEST IN ARRAY
+            parent[slot] = [value]
+            cost += 1
+            op = "E.1.2"
+
     ### VALUE
     else:
         # Change value to a new value.
-        if nr == 0:
-            old = doc
-            doc = generate_json(0, 0, 0, 0, 0, 1)
-            cost += 1
-            print("  C.1 change value from " + str(old) + " to " + str(doc) + 
-                "; cost=1")
+        node = generate_json(0, 0, 0, 0, 0, 1)
+        cost += 1
+        op = "C.1"
+        if parent is None:
+            doc = node
+        else:
+            parent[slot] = node
 
-    return doc, cost
+    if script is not None and op is not None:
+        script.append((op, nr, cost))
 
+    return doc, cost
 
-def modify_json(doc, edits):
+def modify_json(doc, edits, script=None):
     """Given an original JSON document, this function performs a given number 
-    of edit operations on it."""
+    of edit operations on it. The edits are appended to the list script, if 
+    given (see perform_edit)."""
 
     # Sum up the cost of all edits.
     sum_cost = 0
 
-    # Pick edits many nodes from the original JSON document.
-    doc_size = get_size_json(doc)
+    # Pick edits many nodes from the original JSON document. The nodes are 
+    # numbered once, the index is updated by the edits.
+    index = EditIndex(doc)
+    doc_size = len(index)
     # If the given JSON has less nodes than edits, use at most document size 
     # many.
     if edits > doc_size:
@@ -266,7 +348,7 @@ def modify_json(doc, edits):
 
     # Perform edits many edit operations.
     for e in edit_nodes:
-        doc, cost = perform_edit(doc, e)
+        doc, cost = perform_edit(doc, e, index, script)
         sum_cost += cost
 
     return doc, sum_cost
@@ -325,6 +407,162 @@ def generate_json(minofan, maxofan, minafan, maxafan, minnest, maxnest,
     return json_doc
 
 
+def triangular(rng, low, high, mode, size):
+    """Return size numbers of the triangular distribution (as 
+    random.triangular)."""
+    u = rng.random(size)
+    if high == low:
+        return np.full(size, float(low))
+    c = (mode - low)/(high - low)
+    return np.where(u > c, high + (low - high)*np.sqrt((1.0 - u)*(1.0 - c)), 
+            low + (high - low)*np.sqrt(u*c))
+
+def random_strings(rng, size):
+    """Return size random strings of lowercase letters with a length between 
+    1 and 10. The letters of all strings are drawn at once."""
+    ends = np.cumsum(rng.integers(1, 11, size))
+    if size == 0:
+        return []
+    letters = rng.integers(ord('a'), ord('z') + 1, int(ends[-1]), 
+            dtype=np.uint8).tobytes().decode()
+    starts = np.concatenate(([0], ends[:-1]))
+    return [letters[i:j] for i, j in zip(starts.tolist(), ends.tolist())]
+
+def generate_batch(records, rng, minofan, maxofan, minafan, maxafan, minnest, 
+        maxnest):
+    """Generate a list of random json documents with the distribution of 
+    generate_json. The random numbers are drawn in bulk from the NumPy 
+    Generator rng: the nodes of all documents are drawn level by level as 
+    arrays, and the documents are built from the deepest level upwards."""
+
+    # Draw the levels top-down. A level stores the type (0 object, 1 array, 
+    # 2 value) and the fanout of its nodes, the values of its value nodes, 
+    # and the keys of its children (None for children of arrays).
+    levels = []
+    size = records
+    nest = maxnest
+    while size > 0:
+        # Randomly creates either an object, an array, or a value.
+        insert_type = np.ones(size) if nest == 1 else rng.random(size)
+        kind = np.where(insert_type <= 0.35, 0, 
+                np.where(insert_type <= 0.45, 1, 2))
+        fanout = np.zeros(size, dtype=np.int64)
+        objects = kind == 0
+        arrays = kind == 1
+        fanout[objects] = np.rint(triangular(rng, minofan, maxofan, 
+            minofan + (maxofan - minofan)*0.2, int(objects.sum())))
+        fanout[arrays] = np.rint(triangular(rng, minafan, maxafan, 
+            minafan + (maxafan - minafan)*0.2, int(arrays.sum())))
+
+        # Randomly creates either a string, a number, a boolean, or null.
+        values = np.full(size, None, dtype=object)
+        value_nodes = np.flatnonzero(kind == 2)
+        insert_value = rng.random(len(value_nodes))
+        strings = value_nodes[insert_value <= 0.4]
+        numbers = value_nodes[(insert_value > 0.4) & (insert_value <= 0.8)]
+        booleans = value_nodes[(insert_value > 0.8) & (insert_value <= 0.95)]
+        values[strings] = random_strings(rng, len(strings))
+        values[numbers] = rng.integers(0, 101, len(numbers)).tolist()
+        values[booleans] = (rng.random(len(booleans)) >= 0.5).tolist()
+
+        # Keys of the children of objects, in the order of the next level.
+        children = int(fanout.sum())
+        keys = np.full(children, None, dtype=object)
+        object_children = np.repeat(objects, fanout)
+        keys[object_children] = random_strings(rng, 
+                int(object_children.sum()))
+
+        levels.append((kind, fanout, values, keys))
+        size = children
+        nest -= 1
+
+    # Build the documents bottom-up. The children of a node are a 
+    # contiguous range of the next level.
+    below = []
+    for kind, fanout, values, keys in reversed(levels):
+        nodes = values.tolist()
+        keys = keys.tolist()
+        ends = np.cumsum(fanout)
+        starts = ends - fanout
+        for t in (0, 1):
+            containers = np.flatnonzero(kind == t)
+            ranges = zip(containers.tolist(), starts[containers].tolist(), 
+                    ends[containers].tolist())
+            if t == 0: # OBJECT
+                for i, start, end in ranges:
+                    nodes[i] = dict(zip(keys[start:end], below[start:end]))
+            else: # ARRAY
+                for i, start, end in ranges:
+                    nodes[i] = below[start:end]
+        below = nodes
+
+    return below
+
+def generate_records(first, records, args, rng=None):
+    """Generate the records first, first+1, ... of the collection and return 
+    their lines in the output file. Documents are generated with 
+    generate_batch if a NumPy Generator rng is given and with generate_json 
+    otherwise, edits are drawn from the random module. If args.edit_script 
+    is set, the lines of the edit script are returned as well (an empty 
+    string otherwise)."""
+    if rng is not None:
+        docs = generate_batch(records, rng, args.minofan, args.maxofan, 
+            args.minafan, args.maxafan, args.minnest, args.maxnest)
+    else:
+        docs = (generate_json(args.minofan, args.maxofan, 
+            args.minafan, args.maxafan, args.minnest, args.maxnest, 
+            args.nostr, args.nonum, args.nobool, args.nonull) 
+            for x in range(records))
+
+    lines = []
+    script_lines = []
+    script = [] if args.edit_script else None
+    for x, json_doc in enumerate(docs, first):
+        if args.print:
+            print("Generate " + str(x) + ". JSON document...")
+        # json.dumps uses the C encoder, json.dump does not. In the pairs 
+        # format, the document is written along with its edited version.
+        if not args.pairs:
+            lines.append(json.dumps(json_doc) + "\n")
+        if args.print:
+            print(json.dumps(json_doc))
+        if args.diff > 0:
+            # The edits modify the document in place.
+            doc_line = json.dumps(json_doc) if args.pairs else None
+            diff, distance = modify_json(json_doc, args.diff, script)
+            if args.pairs:
+                lines.append(format_pair(doc_line, json.dumps(diff), distance))
+            else:
+                lines.append(json.dumps(diff) + "\n" + str(distance) + "\n")
+            if script is not None:
+                # One line per pair: the record number, the distance, and 
+                # the edits as [operation, node, cost].
+                script_lines.append(json.dumps({"record": x, 
+                    "distance": distance, "edits": script}, 
+                    separators=(',', ':')) + "\n")
+                script.clear()
+            if args.print:
+                print()
+                print(json.dumps(diff))
+                print(str(distance))
+                print()
+
+    return ''.join(lines), ''.join(script_lines)
+
+def generate_block(block, seed, args):
+    """Generate a block of records (range of record numbers) and return its 
+    lines, its edit script lines, and its printed log. The random numbers of 
+    a block only depend on the seed and the first record number, hence the 
+    collection does not depend on the number of processes."""
+    first = block[0]
+    random.seed(str(seed) + "/" + str(first))
+    rng = np.random.default_rng([seed % 2**64, first]) if args.batch else None
+    log = io.StringIO()
+    with redirect_stdout(log):
+        lines, script_lines = generate_records(first, len(block), args, rng)
+
+    return lines, script_lines, log.getvalue()
+
 def main():
     # Read command line arguments.
     parser = ArgumentParser(description='Input parameters for json generator')
@@ -356,10 +594,36 @@ def main():
     parser.add_argument('--collection', type=int, default=1,
                         help='Create a collection with argument many records.')
     parser.add_argument('--filename', type=str, default="",
-                        help='Filename/-path where the collection is stored.')
+                        help='Filename/-path where the collection is stored, \
+                        compressed if it ends with .gz, .xz, or .zst.')
+    parser.add_argument('--pairs', action='store_true',
+                        help='Store each document with its edited version \
+                        and their distance as one JSON object per line \
+                        (see pairfile.py, requires --diff).')
+    parser.add_argument('--edit-script', type=str, default="",
+                        help='Filename/-path where the edits of each pair \
+                        are stored as NDJSON (requires --diff).')
     parser.add_argument('--print', action='store_true',
                         help='Print the generated collection.')
+    parser.add_argument('--batch', default=False, action='store_true',
+                        help='Generate the documents in batches with random \
+                        numbers drawn in bulk by NumPy. Much faster, but a \
+                        seed gives different documents than without.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Seed each block of ' + str(block_size) + ' \
+                        records by itself and generate the blocks with \
+                        jobs processes. The collection only depends on the \
+                        seed, not on the number of jobs, but differs from the \
+                        one generated without --jobs.')
     args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be positive')
+    if args.batch and np is None:
+        parser.error('--batch requires NumPy')
+    if args.edit_script and args.diff == 0:
+        parser.error('--edit-script requires --diff')
+    if args.pairs and args.diff == 0:
+        parser.error('--pairs requires --diff')
 
     # Set the seed for the random number generator.
     seed = args.seed
@@ -390,34 +654,44 @@ def main():
 
     # Open specified file that stores the generated data.
     if args.filename != "":
-        outfile = open(args.filename, 'w')
-
-    # Generate a collection of given size with random JSON documents.
-    for x in range(args.collection):
-        if args.print:
-            print("Generate " + str(x) + ". JSON document...")
-        json_doc = generate_json(args.minofan, args.maxofan, 
-            args.minafan, args.maxafan, args.minnest, args.maxnest, 
-            args.nostr, args.nonum, args.nobool, args.nonull)
-        if args.filename != "":
-            json.dump(json_doc, outfile)
-            outfile.write("\n")
-        if args.print:
-            print(json.dumps(json_doc))
-        if args.diff > 0:
-            diff, distance = modify_json(json_doc, args.diff)
+        outfile = open_file(args.filename, 'w')
+
+    # Open the file that stores the edit script.
+    if args.edit_script:
+        scriptfile = open_file(args.edit_script, 'w')
+
+    # Write the lines of the generated blocks and print their logs in order.
+    def write(blocks):
+        for lines, script_lines, log in blocks:
+            sys.stdout.write(log)
+            if args.edit_script:
+                scriptfile.write(script_lines)
             if args.filename != "":
-                json.dump(diff, outfile)
-                outfile.write("\n" + str(distance) + "\n")
-            if args.print:
-                print()
-                print(json.dumps(diff))
-                print(str(distance))
-                print()
+                outfile.write(lines)
+
+    # Generate a collection of given size with random JSON documents in 
+    # blocks of records. Either all blocks draw from a single random stream 
+    # (and print directly), or (--jobs) each block is seeded by itself and 
+    # the blocks are generated by a pool of processes.
+    starts = range(0, args.collection, block_size)
+    records = range(args.collection)
+    if args.jobs is None:
+        rng = np.random.default_rng(seed) if args.batch else None
+        write(generate_records(start, len(records[start:start + 
+            block_size]), args, rng) + ("",) for start in starts)
+    elif args.jobs > 1:
+        with Pool(args.jobs) as pool:
+            write(map_batches(pool, generate_block, records, args.jobs, 
+                block_size, seed, args))
+    else:
+        write(generate_block(records[start:start + block_size], seed, args) 
+            for start in starts)
 
     # Close specified file that stores the generated data.
     if args.filename != "":
         outfile.close()
+    if args.edit_script:
+        scriptfile.close()
 
     return
 
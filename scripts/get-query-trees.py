@@ -23,13 +23,96 @@
 
 """get-query-trees.py: Extract the IDs of query trees from a given JSON document
 collection. The query trees are selected based on the quantiles and the 
-according thresholds of size 5%, 10%, 20% and 30%."""
+according thresholds of size 5%, 10%, 20% and 30% (configurable). Quantiles 
+and queries are found from a histogram of the tree sizes in linear time."""
 
 import sys
 import math
 from argparse import ArgumentParser
+from bisect import bisect_left
 import subprocess
 import statistics
+from bracketfile import iter_node_counts, iter_index_sizes, has_index
+from treefile import is_tree_file, iter_tree_sizes
+from compressed import open_file
+
+def size_histogram(counts, keep):
+    """Return the number of records per size and the line numbers of the 
+    first keep records per size in one pass over the sizes."""
+    histogram = {}
+    lines = {}
+    for line, size in enumerate(counts, 1):
+        if size in histogram:
+            histogram[size] += 1
+            if len(lines[size]) < keep:
+                lines[size].append(line)
+        else:
+            histogram[size] = 1
+            lines[size] = [line]
+
+    return histogram, lines
+
+def order_statistics(histogram, ranks):
+    """Return the values at the given (sorted, 0-based) ranks of the sizes 
+    counted in the histogram."""
+    values = []
+    seen = 0
+    ranks = iter(ranks)
+    rank = next(ranks, None)
+    for size in sorted(histogram):
+        seen += histogram[size]
+        while rank is not None and rank < seen:
+            values.append(size)
+            rank = next(ranks, None)
+
+    return values
+
+def quantiles(histogram, n):
+    """Return the n-1 cut points that divide the sizes into n intervals, 
+    equal to statistics.quantiles(sizes, n=n) but without sorting all 
+    sizes."""
+    ld = sum(histogram.values())
+    if ld < 2:
+        raise statistics.StatisticsError('must have at least two data points')
+    m = ld + 1
+    positions = []
+    for i in range(1, n):
+        j = i * m // n                               # rescale i to m/n
+        j = 1 if j < 1 else ld-1 if j > ld-1 else j  # clamp to 1 .. ld-1
+        positions.append(j)
+    ranks = sorted(set(positions) | set(j - 1 for j in positions))
+    values = dict(zip(ranks, order_statistics(histogram, ranks)))
+
+    result = []
+    for i, j in enumerate(positions, 1):
+        delta = i*m - j*n                            # exact integer math
+        result.append((values[j - 1] * (n - delta) + values[j] * delta) / n)
+
+    return result
+
+def select_queries(histogram, lines, cuts):
+    """Select a query (size, line) per cut point: the first record in the 
+    order of (size, line) that is at least as large as the cut point and 
+    comes after the query of the previous cut point."""
+    sizes = sorted(histogram)
+    queries = []
+    previous = (0, 0)
+    for cut in cuts:
+        query = None
+        for size in sizes[bisect_left(sizes, cut):]:
+            for line in lines[size]:
+                if (size, line) > previous:
+                    query = (size, line)
+                    break
+            if query is not None:
+                break
+        # No record is left for this or any later cut point.
+        if query is None:
+            break
+        queries.append(query)
+        previous = query
+
+    return queries
 
 def main(argv):
     # Read command line arguments.
@@ -39,59 +122,50 @@ def main(argv):
         required=True, help='<Required> Filename/-path where the experimental \
         results are stored.')
     parser.add_argument('-q','--quantiles', type=int, default=0,
-        required=True, help='<Required> Give number of quantiles.')
+        required=True, help='<Required> Give number of quantiles, i.e., cut \
+        points and query trees per file (3 for the quartiles).')
     parser.add_argument('-t','--thresholds', type=int, default=0,
         required=True, help='<Required> Give number of thresholds per \
         quantiles.')
+    parser.add_argument('-r','--ratios', nargs='+', type=float, 
+        default=[0.05, 0.1, 0.2, 0.3], help='Thresholds relative to the size \
+        of a query tree (default=0.05 0.1 0.2 0.3).')
     parser.add_argument('-a','--algorithms', type=int, default=0,
         help='Used algorithms for lookup queries.')
+    parser.add_argument('-s','--sizes', default=False, action='store_true',
+        help='The input files store the number of nodes per record, one per \
+        line, as written by preprocess-json.py.')
     args = parser.parse_args()
+    if args.quantiles < 1:
+        parser.error('at least one quantile is required')
+    if args.thresholds > len(args.ratios):
+        parser.error('more thresholds than ratios given')
+    ratios = args.ratios[:args.thresholds]
 
     cargs = ""
     for file in args.inputfiles:
-        # Using readlines()
-        lines = open(file, 'r').readlines()
-
-        sizes = []
-        line_count = 1
-        # Strips the newline character
-        for line in lines:
-            count = 1
-            for char in range(1, len(line)):
-                if line[char] == "{" and line[char-1] != "\\":
-                    count += 1
-
-            sizes.append((count, line_count))
-            line_count += 1
-
-        quantiles = statistics.quantiles([x[0] for x in sizes])
-        print(quantiles)
-        small_query = 0
-        medium_query = 0
-        large_query = 0
-
-        for (size, idx) in sorted(sizes):
-            if small_query == 0 and size >= quantiles[0]:
-                small_query = (size, idx)
-            elif medium_query == 0 and size >= quantiles[1]:
-                medium_query = (size, idx)
-            elif large_query == 0 and size >= quantiles[2]:
-                large_query = (size, idx)
-        print(str(small_query[1]) + "\t(" + str(small_query[0]) + ")\t" + 
-                str(math.ceil(small_query[0]*0.05)) + " " + 
-                str(math.ceil(small_query[0]*0.1)) + " " + 
-                str(math.ceil(small_query[0]*0.2)) + " " + 
-                str(math.ceil(small_query[0]*0.3)))
-        print(str(medium_query[1]) + "\t(" + str(medium_query[0]) + ")\t" + 
-                str(math.ceil(medium_query[0]*0.05)) + " " + 
-                str(math.ceil(medium_query[0]*0.1)) + " " + 
-                str(math.ceil(medium_query[0]*0.2)) + " " + 
-                str(math.ceil(medium_query[0]*0.3)))
-        print(str(large_query[1]) + "\t(" + str(large_query[0]) + ")\t" + 
-            str(math.ceil(large_query[0]*0.05)) + " " + 
-            str(math.ceil(large_query[0]*0.1)) + " " + 
-            str(math.ceil(large_query[0]*0.2)) + " " + 
-            str(math.ceil(large_query[0]*0.3)))
+        # Either take precomputed sizes as they are, read them from the 
+        # record headers of a tree file or from the offset index of a bracket 
+        # file, or count the nodes of each line of the bracket file.
+        if args.sizes:
+            sizes_file = open_file(file)
+            counts = (int(line) for line in sizes_file)
+        elif is_tree_file(file):
+            counts = iter_tree_sizes(file)
+        elif has_index(file):
+            counts = iter_index_sizes(file)
+        else:
+            counts = iter_node_counts(file)
+        # Only the first records per size are candidates for queries.
+        histogram, lines = size_histogram(counts, args.quantiles)
+        if args.sizes:
+            sizes_file.close()
+
+        cuts = quantiles(histogram, args.quantiles + 1)
+        print(cuts)
+        for (size, idx) in select_queries(histogram, lines, cuts):
+            print(str(idx) + "\t(" + str(size) + ")\t" + 
+                    " ".join(str(math.ceil(size*r)) for r in ratios))
         
 
 if __name__ == '__main__':
@@ -0,0 +1,137 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""instrument.py: Instrumentation of long-running conversions. Progress 
+reports the records processed, the bytes read, the rate, and the remaining 
+time to stderr in regular intervals, and the time spent per phase (e.g., 
+parse, traverse, write) at the end. profile writes a cProfile dump of the 
+process."""
+
+import os
+import sys
+import atexit
+import cProfile
+from time import perf_counter
+
+def duration(seconds):
+    """Return the seconds formatted as h:mm:ss."""
+    seconds = int(seconds)
+    return (str(seconds // 3600) + ':' + str(seconds // 60 % 60).zfill(2) + 
+            ':' + str(seconds % 60).zfill(2))
+
+class Progress:
+    """Progress of reading the records of an input file. The bytes read are 
+    taken from the position of the file descriptor, hence they count the 
+    compressed bytes of compressed files. The time between two calls of lap 
+    is added to the given phase."""
+
+    def __init__(self, input_file, interval=10.0, out=sys.stderr):
+        self.fd = input_file.fileno()
+        self.size = os.fstat(self.fd).st_size
+        self.interval = interval
+        self.out = out
+        self.records = 0
+        self.finished = False
+        self.phases = {}
+        self.start = self.last = perf_counter()
+        self.next_report = self.start + interval
+
+    def lap(self, phase):
+        """Add the time since the last lap to phase."""
+        now = perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+        if now >= self.next_report:
+            self.report(now)
+            self.next_report = now + self.interval
+
+    def iterate(self, data, phase='parse'):
+        """Yield the records of data and count them. The time to produce a 
+        record is added to phase, the time until the next record is 
+        requested to 'other' (unless the caller takes laps)."""
+        data = iter(data)
+        while True:
+            self.lap('other')
+            try:
+                record = next(data)
+            except StopIteration:
+                return
+            self.records += 1
+            self.lap(phase)
+            yield record
+
+    def bytes_read(self):
+        if self.finished:
+            return self.size
+        try:
+            return os.lseek(self.fd, 0, os.SEEK_CUR)
+        except OSError:
+            return 0
+
+    def report(self, now=None):
+        """Print the records and bytes read so far, the rates, and the 
+        remaining time estimated from the bytes read."""
+        if now is None:
+            now = perf_counter()
+        elapsed = max(now - self.start, 1e-9)
+        done = min(self.bytes_read(), self.size)
+        line = ('progress: ' + str(self.records) + ' records, ' + 
+                str(round(done/1e6, 1)) + '/' + str(round(self.size/1e6, 1)) + 
+                ' MB')
+        if self.size:
+            line += ' (' + str(round(100*done/self.size, 1)) + '%)'
+        line += (', ' + str(round(self.records/elapsed)) + ' records/s, ' + 
+                str(round(done/elapsed/1e6, 2)) + ' MB/s, elapsed ' + 
+                duration(elapsed))
+        if 0 < done < self.size:
+            line += ', ETA ' + duration(elapsed*(self.size - done)/done)
+        print(line, file=self.out, flush=True)
+
+    def close(self):
+        """Print the final progress and the time per phase once the input is 
+        read completely."""
+        self.finished = True
+        now = perf_counter()
+        self.report(now)
+        total = max(now - self.start, 1e-9)
+        print('phases: ' + ', '.join(phase + ' ' + str(round(seconds, 2)) + 
+                ' s (' + str(round(100*seconds/total, 1)) + '%)' 
+                for phase, seconds in sorted(self.phases.items(), 
+                    key=lambda item: -item[1])), file=self.out, flush=True)
+
+def no_lap(phase):
+    """Lap of a disabled Progress."""
+    return
+
+def profile(filename):
+    """Profile the rest of the process with cProfile and write the 
+    statistics to filename at exit (see pstats). Worker processes are not 
+    profiled."""
+    profiler = cProfile.Profile()
+
+    def dump():
+        profiler.disable()
+        profiler.dump_stats(filename)
+
+    atexit.register(dump)
+    profiler.enable()
+    return profiler
@@ -25,7 +25,14 @@
 
 import sys
 from argparse import ArgumentParser
-import json
+from multiprocessing import Pool
+from jsontree import walk, iter_records, map_batches, OBJECT, ARRAY, KEY, VALUE
+from collections import Counter
+from treefile import TreeWriter, write_labels, to_bracket
+from bracketfile import write_index, remove_index
+from jsonparse import get_loads, available, load
+from compressed import open_file, output_compression
+from instrument import Progress, no_lap, profile
 # JSON         | Python
 # -------------+--------
 # object       | dict
@@ -38,58 +45,318 @@ import json
 # null         | None
 
 sort_key = False
+# Label -> ID (as string) if labels are replaced by IDs, see --label-ids.
+label_ids = None
 
-def json2bracket(x):
+def escape(label):
+    """Remove non-ASCII characters and escape curly braces of a key."""
+    if not label.isascii():
+        label = label.encode("ascii", "ignore").decode()
+    if "{" in label or "}" in label:
+        label = label.replace("{", "\\{").replace("}", "\\}")
+    return label
+
+def value2bracket(x):
+    """Return the bracket notation of a value (string, number, boolean, or 
+    null)."""
+    if type(x) is str:
+        # Closing braces of values are escaped as "\{" to keep the output 
+        # identical to earlier conversions.
+        if not x.isascii():
+            x = x.encode("ascii", "ignore").decode()
+        if "{" in x or "}" in x:
+            x = x.replace("{", "\\{").replace("}", "\\{")
+        return '{"' + "".join(x.split()) + '"}'
+    if x is None: # NULL
+        return '{null}'
+    return '{' + str(x) + '}' # NUMBER, BOOLEAN
+
+def convert(x, out):
+    """Recursively append the bracket notation of x to the list out."""
     global sort_key
-    if isinstance(x, dict): # OBJECT
-        print('{\{\}', end='')
-        if sort_key:
-            for key, val in sorted(x.items()):
-                k = key.encode("ascii", "ignore").decode()
-                print('{"' + k.replace("{", "\{").replace("}", "\}") + 
-                        '":', end='')
-                json2bracket(val)
-                print('}', end='')
-        else:
-            for key, val in x.items():
-                k = key.encode("ascii", "ignore").decode()
-                print('{"' + k.replace("{", "\{").replace("}", "\}") + 
-                        '":', end='')
-                json2bracket(val)
-                print('}', end='')
-        print('}', end='')
-    elif isinstance(x, list): # ARRAY
-        print('{[]', end='')
+    append = out.append
+    t = type(x)
+    if t is dict: # OBJECT
+        append('{\\{\\}')
+        items = sorted(x.items()) if sort_key else x.items()
+        for key, val in items:
+            append('{"' + escape(key) + '":')
+            convert(val, out)
+            append('}')
+        append('}')
+    elif t is list: # ARRAY
+        append('{[]')
         cnt = 1
         for val in x:
             # Remove the comments below to insert array order nodes.
-            # print('{' + str(cnt), end='')
-            json2bracket(val)
+            # append('{' + str(cnt))
+            convert(val, out)
             cnt += 1
-            # print('}', end='')
-        print('}', end='')
+            # append('}')
+        append('}')
     else: # VALUE
-        if isinstance(x, str):
-            x = x.encode("ascii", "ignore").decode()
-            print('{"' + "".join(x.replace("{", "\{").replace("}", 
-                    "\{").split()) + '"}', end='')
-        elif isinstance(x, int):
-            print('{' + str(x) + '}', end='')
-        elif isinstance(x, float):
-            print('{' + str(x) + '}', end='')
-        elif isinstance(x, bool):
-            print('{' + str(x) + '}', end='')
-        else: # NULL
-            print('{' + 'null' + '}', end='')
+        append(value2bracket(x))
+
+    return
+
+def convert_deep(x, out):
+    """Append the bracket notation of x to the list out without recursion."""
+    append = out.append
+
+    def enter(kind, node, parent, slot, level):
+        if kind == KEY:
+            append('{"' + escape(node) + '":')
+        elif kind == OBJECT:
+            append('{\\{\\}')
+        elif kind == ARRAY:
+            append('{[]')
+        else: # VALUE
+            append(value2bracket(node))
+
+    def leave(kind, node, parent, slot, level):
+        if kind != VALUE:
+            append('}')
+
+    walk(x, enter, leave, sort_key)
+
+    return
+
+def json2bracket(x, out):
+    """Append the bracket notation of the JSON value x to the list out. The 
+    caller joins the list once per record instead of writing every token.
+
+    Recursion is faster than the explicit stack of jsontree.walk, hence it is 
+    used unless a document is nested deeper than the recursion limit."""
+    if label_ids is not None:
+        out.append(json2ids(x))
+        return
+    start = len(out)
+    try:
+        convert(x, out)
+    except RecursionError:
+        del out[start:]
+        convert_deep(x, out)
+
+    return
+
+def tree(x, parents, labels):
+    """Recursively append the nodes of x in postorder to the lists parents 
+    and labels and return the number of the root of x."""
+    t = type(x)
+    if t is dict: # OBJECT
+        children = []
+        items = sorted(x.items()) if sort_key else x.items()
+        for key, val in items:
+            child = tree(val, parents, labels)
+            i = len(labels)
+            parents[child] = i
+            parents.append(-1)
+            labels.append('"' + escape(key) + '":')
+            children.append(i)
+        label = '\\{\\}'
+    elif t is list: # ARRAY
+        children = [tree(val, parents, labels) for val in x]
+        label = '[]'
+    else: # VALUE
+        children = []
+        label = value2bracket(x)[1:-1]
+
+    i = len(labels)
+    for child in children:
+        parents[child] = i
+    parents.append(-1)
+    labels.append(label)
+
+    return i
+
+def tree_deep(x):
+    """Return the tree of x as parent array and node labels without 
+    recursion."""
+    parents = []
+    labels = []
+    # Labels and children of the nodes that are entered but not left yet.
+    ancestors = []
+
+    def enter(kind, node, parent, slot, level):
+        if kind == KEY:
+            label = '"' + escape(node) + '":'
+        elif kind == OBJECT:
+            label = '\\{\\}'
+        elif kind == ARRAY:
+            label = '[]'
+        else: # VALUE
+            label = value2bracket(node)[1:-1]
+        ancestors.append((label, []))
+
+    def leave(kind, node, parent, slot, level):
+        label, children = ancestors.pop()
+        i = len(labels)
+        labels.append(label)
+        parents.append(-1)
+        for child in children:
+            parents[child] = i
+        if ancestors:
+            ancestors[-1][1].append(i)
+
+    walk(x, enter, leave, sort_key)
+
+    return parents, labels
+
+def json2tree(x):
+    """Return the tree of the JSON value x as parent array and node labels, 
+    both in postorder (see treefile.py). As for json2bracket, the explicit 
+    stack is only used for documents nested deeper than the recursion 
+    limit."""
+    parents = []
+    labels = []
+    try:
+        tree(x, parents, labels)
+    except RecursionError:
+        return tree_deep(x)
+
+    return parents, labels
+
+def convert_ids(x, out):
+    """Recursively append the bracket notation of x with labels replaced by 
+    their IDs to the list out."""
+    append = out.append
+    t = type(x)
+    if t is dict: # OBJECT
+        append('{' + label_ids['\\{\\}'])
+        items = sorted(x.items()) if sort_key else x.items()
+        for key, val in items:
+            append('{' + label_ids['"' + escape(key) + '":'])
+            convert_ids(val, out)
+            append('}')
+        append('}')
+    elif t is list: # ARRAY
+        append('{' + label_ids['[]'])
+        for val in x:
+            convert_ids(val, out)
+        append('}')
+    else: # VALUE
+        append('{' + label_ids[value2bracket(x)[1:-1]] + '}')
+
+    return
+
+def json2ids(x):
+    """Return the bracket notation of x with labels replaced by their IDs in 
+    the label dictionary."""
+    out = []
+    try:
+        convert_ids(x, out)
+    except RecursionError:
+        parents, labels = json2tree(x)
+        return to_bracket(parents, [label_ids[label] for label in labels])
+
+    return ''.join(out)
+
+def collect_labels(x, out):
+    """Recursively append the labels of the nodes of x to the list out."""
+    append = out.append
+    t = type(x)
+    if t is dict: # OBJECT
+        append('\\{\\}')
+        for key, val in x.items():
+            append('"' + escape(key) + '":')
+            collect_labels(val, out)
+    elif t is list: # ARRAY
+        append('[]')
+        for val in x:
+            collect_labels(val, out)
+    else: # VALUE
+        append(value2bracket(x)[1:-1])
+
+    return
+
+def label_batch(batch, parse=None):
+    """Return the frequency of each label in a batch of records. If parse is 
+    given, the batch holds the lines of an ndjson collection that are parsed 
+    with it."""
+    counts = Counter()
+    for d in batch:
+        if parse:
+            d = parse(d)
+        labels = []
+        try:
+            collect_labels(d, labels)
+        except RecursionError:
+            labels = tree_deep(d)[1]
+        counts.update(labels)
+    return counts
+
+def count_labels(data, jobs=1, batch_size=1000, parse=None):
+    """Return the frequency of each label in the records of data."""
+    if jobs <= 1:
+        return label_batch(data, parse)
+    counts = Counter()
+    with Pool(jobs, init_worker, (sort_key,)) as pool:
+        for part in map_batches(pool, label_batch, data, jobs, batch_size, 
+                parse):
+            counts.update(part)
+    return counts
+
+def label_dictionary(counts):
+    """Return the labels ordered by decreasing frequency, i.e., frequent 
+    labels get small IDs. Ties are ordered by label to keep the IDs 
+    independent of the number of jobs."""
+    return sorted(counts, key=lambda label: (-counts[label], label))
+
+def init_worker(sorted_keys, ids=None):
+    """Pass the sort flag and the label IDs to worker processes."""
+    global sort_key, label_ids
+    sort_key = sorted_keys
+    label_ids = ids
+
+def convert_batch(batch, parse=None):
+    """Convert a batch of records into bracket notation, one per line. If 
+    parse is given, the batch holds the lines of an ndjson collection that 
+    are parsed with it by the worker itself."""
+    out = []
+    for d in batch:
+        if parse:
+            d = parse(d)
+        json2bracket(d, out)
+        out.append('\n')
+    return ''.join(out)
+
+def tree_batch(batch, parse=None):
+    """Convert a batch of records into trees (see json2tree)."""
+    return [json2tree(parse(d) if parse else d) for d in batch]
+
+def convert_parallel(data, out, jobs, batch_size, parse=None):
+    """Convert the records of a collection with a pool of jobs processes and 
+    write the results in the original record order."""
+    trees = isinstance(out, TreeWriter)
+    with Pool(jobs, init_worker, (sort_key, label_ids)) as pool:
+        for result in map_batches(pool, tree_batch if trees else 
+                convert_batch, data, jobs, batch_size, parse):
+            if trees:
+                for parents, labels in result:
+                    out.write(parents, labels)
+            else:
+                out.write(result)
 
     return
 
+def open_output(filename, format='bracket', labels=None, append=False):
+    """Open the output file (or stdout) with a large write buffer. Tree files 
+    use the given label dictionary, if any. If append is set, an existing 
+    text file is extended. Text files are compressed according to the suffix 
+    of their name (see compressed.py)."""
+    if format == 'tree':
+        return TreeWriter(filename, labels)
+    if filename:
+        return open_file(filename, 'a' if append else 'w')
+    return open(sys.stdout.fileno(), 'w', buffering=1 << 20, closefd=False)
+
 def main():
     # Read command line arguments.
     parser = ArgumentParser(description='Input parameters for JSON to bracket \
                             notation converter.')
     parser.add_argument('-f', '--filename', type=str, required=True,
-                        help='Filename/-path where the collection is stored.')
+                        help='Filename/-path where the collection is stored, \
+                        optionally compressed (gzip, xz, zstd).')
     parser.add_argument('-c', '--collection', default=False,
                         action='store_true', help='Parse a collection of JSON \
                         documents, i.e., surrounded by an array.')
@@ -97,30 +364,162 @@ def main():
                         help='Sort key-value pairs by key.')
     parser.add_argument('-p', '--print', default=False, action='store_true',
                         help='Print the header with dataset info.')
+    parser.add_argument('--stream', default=False, action='store_true',
+                        help='Read the collection record by record instead \
+                        of loading it at once (requires -c).')
+    parser.add_argument('--ndjson', default=False, action='store_true',
+                        help='Stream a collection that stores one JSON \
+                        document per line.')
+    parser.add_argument('-o', '--output', type=str, default='',
+                        help='Filename/-path of the output, compressed if it \
+                        ends with .gz, .xz, or .zst (default=stdout).')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of processes that convert a collection \
+                        (default=1).')
+    parser.add_argument('--batch', type=int, default=1000,
+                        help='Number of records per batch and process when \
+                        running with several jobs (default=1000).')
+    parser.add_argument('--format', choices=['bracket', 'tree'], 
+                        default='bracket', help='Output format, either \
+                        bracket notation or binary trees (see treefile.py, \
+                        requires -o, default=bracket).')
+    parser.add_argument('--label-ids', default=False, action='store_true',
+                        help='Number the labels of the collection by \
+                        decreasing frequency and write the dictionary to \
+                        <output>.labels. Bracket notation then holds the IDs \
+                        instead of the labels (requires -o).')
+    parser.add_argument('--index', default=False, action='store_true',
+                        help='Write the offset index <output>.idx for random \
+                        access to the records (see bracketfile.py, requires \
+                        -o).')
+    parser.add_argument('--parser', choices=['auto'] + available(), 
+                        default='auto', help='JSON parser of the records, \
+                        the fastest installed one by default (see \
+                        jsonparse.py).')
+    parser.add_argument('--progress', type=float, nargs='?', const=10.0,
+                        default=None, metavar='SECONDS', help='Report the \
+                        progress to stderr every SECONDS (default=10) and the \
+                        time per phase at the end.')
+    parser.add_argument('--profile', type=str, default='',
+                        help='Filename/-path of a cProfile dump of the run \
+                        (see pstats, worker processes are not profiled).')
     args = parser.parse_args()
+    if args.index and (not args.output or args.format != 'bracket'):
+        parser.error('--index requires -o/--output and bracket notation')
+    if output_compression(args.output) and (args.index or 
+            args.format == 'tree'):
+        parser.error('--index and --format tree require an uncompressed '
+                'output')
+    if args.label_ids and not args.output:
+        parser.error('--label-ids requires -o/--output')
+    if args.format == 'tree' and not args.output:
+        parser.error('--format tree requires -o/--output')
+    if args.format == 'tree' and args.print:
+        parser.error('--format tree has no header, drop -p/--print')
+    if args.stream and not args.collection:
+        parser.error('--stream requires -c/--collection')
+    if args.ndjson:
+        args.collection = True
+        args.stream = True
+    # The workers parse the records themselves, since parsed records are 
+    # pickled recursively and fail if they are deeply nested.
+    if args.collection and args.jobs > 1:
+        args.stream = True
+    if args.output and not args.index:
+        remove_index(args.output)
+    if args.profile:
+        profile(args.profile)
+    raw = False
+    loads = get_loads(args.parser)
 
     # Set flag to sort key-value pairs by key.
-    global sort_key
+    global sort_key, label_ids
     sort_key = args.sorted
 
-    with open(args.filename) as json_file:
-        data = json.load(json_file)
-        records = len(data)
-
-        # Print header with dataset statistics.
-        if args.print:
-            print("BRACKET NOTATION:")
-            print("#record: " + str(records))
-            print()
-
-        # Based on input parameters either parse (1) a collection 
-        # nested in an array or (2) a single document.
-        if args.collection:
-            for d in data:
-                json2bracket(d)
-                print()
+    with open_file(args.filename) as json_file:
+        progress = Progress(json_file, args.progress) if args.progress \
+                else None
+        lap = progress.lap if progress else no_lap
+
+        # Either stream the records of the collection or load the whole 
+        # document at once.
+        if args.stream:
+            # With several jobs, the workers parse the records themselves.
+            raw = args.jobs > 1
+            data = iter_records(json_file, args.ndjson, raw, loads=loads)
+            # Counting the records for the header requires a separate pass.
+            if args.print:
+                records = sum(1 for d in data)
+                json_file.seek(0)
+                data = iter_records(json_file, args.ndjson, raw, loads=loads)
+                lap('count')
         else:
-            json2bracket(data)
+            data = load(json_file, loads)
+            records = len(data)
+            lap('parse')
+
+        # The label dictionary requires a separate pass over all labels.
+        dictionary = None
+        if args.label_ids:
+            counts = count_labels(data if args.collection else [data], 
+                    args.jobs if args.collection else 1, args.batch, 
+                    loads if raw else None)
+            dictionary = label_dictionary(counts)
+            del counts
+            if args.stream:
+                json_file.seek(0)
+                data = iter_records(json_file, args.ndjson, raw, loads=loads)
+            if args.format == 'bracket':
+                write_labels(args.output, dictionary)
+                label_ids = {label: str(i) for i, label in 
+                        enumerate(dictionary)}
+            lap('labels')
+
+        # Count the records of a collection and time their parsing.
+        if progress and args.collection:
+            data = progress.iterate(data)
+
+        with open_output(args.output, args.format, dictionary) as out:
+            # Print header with dataset statistics.
+            if args.print:
+                out.write("BRACKET NOTATION:\n")
+                out.write("#record: " + str(records) + "\n")
+                out.write("\n")
+
+            # Based on input parameters either parse (1) a collection 
+            # nested in an array or (2) a single document. Each record is 
+            # written with a single call.
+            if args.collection and args.jobs > 1:
+                convert_parallel(data, out, args.jobs, args.batch, 
+                        loads if raw else None)
+            elif args.format == 'tree':
+                for d in (data if args.collection else [data]):
+                    parents, labels = json2tree(d)
+                    lap('traverse')
+                    out.write(parents, labels)
+                    lap('write')
+            elif args.collection:
+                for d in data:
+                    record = []
+                    json2bracket(d, record)
+                    record.append('\n')
+                    lap('traverse')
+                    out.write(''.join(record))
+                    lap('write')
+            else:
+                record = []
+                json2bracket(data, record)
+                lap('traverse')
+                out.write(''.join(record))
+            lap('write')
+
+    if progress:
+        progress.close()
+
+    # The index is built from the written file, which is read at the bytes 
+    # level and cheap compared to the conversion.
+    if args.index:
+        write_index(args.output)
 
     return
 
@@ -0,0 +1,250 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""jsonparse.py: Pluggable JSON parsers. The records of a collection are 
+parsed with the fastest installed backend (orjson, simdjson, ujson), or with 
+the json module of the standard library otherwise. All backends return the 
+same Python values (see the table in jsontree.py).
+
+Documents that are too large to be loaded at once are read as a sequence of 
+parser events with iter_events (see analyze-json.py --events). Documents 
+nested deeper than the recursion limit are built from their events without 
+recursion (see build)."""
+
+import io
+import re
+import json
+from json.decoder import scanstring
+
+# The fast backends only support integers of at most 64 bits and reject 
+# NaN and Infinity. Such documents are parsed by the json module instead. 
+# orjson does not reject larger integers but returns them as floats, hence 
+# documents with integer literals of 19 or more digits (found by a scan 
+# that may also match within strings) are never given to a fast backend.
+# The scan maps all digits to 0 and searches 19 zeros, which is much faster 
+# than a regular expression.
+digits = bytes.maketrans(b'123456789', b'000000000')
+long_number = b'0'*19
+
+def has_long_number(s):
+    """Return whether the JSON text s may hold an integer beyond 64 bits."""
+    if type(s) is str:
+        s = s.encode()
+    return long_number in s.translate(digits)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+def json_loads(s):
+    """Parse the JSON text s with the json module, whose decoder recurses per 
+    level of nesting. Deeper documents are built from their parser events 
+    instead."""
+    try:
+        return json.loads(s)
+    except RecursionError:
+        if type(s) is not str:
+            s = s.decode()
+        return build(iter_events(io.StringIO(s)))
+
+def orjson_loads(s):
+    if has_long_number(s):
+        return json_loads(s)
+    try:
+        return orjson.loads(s)
+    except orjson.JSONDecodeError:
+        return json_loads(s)
+
+def simdjson_loads(s):
+    if has_long_number(s):
+        return json_loads(s)
+    try:
+        return simdjson.loads(s)
+    except ValueError:
+        return json_loads(s)
+
+def ujson_loads(s):
+    if has_long_number(s):
+        return json_loads(s)
+    try:
+        return ujson.loads(s)
+    except ValueError:
+        return json_loads(s)
+
+# Backends in order of preference. The functions are defined at module 
+# level, such that they can be passed to worker processes.
+backends = {
+    'orjson': orjson_loads if orjson is not None else None,
+    'simdjson': simdjson_loads if simdjson is not None else None,
+    'ujson': ujson_loads if ujson is not None else None,
+    'json': json_loads,
+}
+
+def available():
+    """Return the names of the installed backends in order of preference."""
+    return [name for name, loads in backends.items() if loads is not None]
+
+def get_loads(name='auto'):
+    """Return the function that parses a JSON text (str or bytes) with the 
+    given backend, or with the fastest installed one for 'auto'."""
+    if name == 'auto':
+        name = available()[0]
+    if backends.get(name) is None:
+        raise ValueError('JSON backend ' + name + ' is not installed.')
+    return backends[name]
+
+def load(json_file, loads=json_loads):
+    """Parse the whole content of an open file with the function loads."""
+    return loads(json_file.read())
+
+# Tokens of the event parser. Strings are scanned separately.
+token = re.compile(r'[ \t\n\r]*(?:([{}\[\],:"])|(-?(?:0|[1-9][0-9]*)'
+    r'(\.[0-9]+)?([eE][-+]?[0-9]+)?)|(true|false|null|NaN|Infinity|'
+    r'-Infinity))')
+whitespace = re.compile(r'[ \t\n\r]*')
+literals = {'true': ('boolean', True), 'false': ('boolean', False), 
+    'null': ('null', None), 'NaN': ('number', float('nan')), 
+    'Infinity': ('number', float('inf')), 
+    '-Infinity': ('number', float('-inf'))}
+structure = {'{': 'start_map', '}': 'end_map', '[': 'start_array', 
+    ']': 'end_array'}
+
+def iter_events(json_file, chunk_size=1 << 20):
+    """Yield the events of the JSON document in an open (text) file as tuples 
+    (event, value), without building the document. The events are the ones 
+    of ijson.basic_parse: start_map, map_key, end_map, start_array, 
+    end_array, string, number, boolean, and null. Only the current chunk of 
+    the file is kept in memory. Several documents in a row, e.g., the lines 
+    of an ndjson collection, yield their events one after the other. ijson 
+    is used if it is installed. The structure of the documents is not 
+    validated."""
+
+    if ijson is not None:
+        yield from ijson.basic_parse(json_file, use_float=True, 
+                multiple_values=True)
+        return
+
+    buf = json_file.read(chunk_size)
+    eof = buf == ''
+    pos = 0
+    # The open containers, True for objects. A string in an object is a key 
+    # if it follows the opening brace or a comma.
+    containers = []
+    key = False
+
+    while True:
+        m = token.match(buf, pos)
+        string = m is not None and m.group(1) == '"'
+        # The next token may be incomplete if it reaches the end of the 
+        # buffer, if it is a number whose fraction or exponent is cut off, 
+        # or if it is an unterminated string. Drop the consumed part of the 
+        # buffer and read more.
+        if not eof and (m is None or m.end() == len(buf) or string or 
+                m.group(2) is not None and buf[m.end()] in '.eE'):
+            incomplete = not string
+            if string:
+                try:
+                    s, end = scanstring(buf, m.end())
+                except json.JSONDecodeError:
+                    incomplete = True
+            if incomplete:
+                more = json_file.read(max(chunk_size, len(buf) - pos))
+                buf = buf[pos:] + more
+                eof = more == ''
+                pos = 0
+                continue
+        if m is None:
+            if whitespace.match(buf, pos).end() == len(buf):
+                return
+            raise ValueError('Invalid JSON: ' + repr(buf[pos:pos + 20]))
+
+        pos = m.end()
+        c = m.group(1)
+        if c is None:
+            number = m.group(2)
+            if number is None:
+                yield literals[m.group(5)]
+            elif m.group(3) is None and m.group(4) is None:
+                yield 'number', int(number)
+            else:
+                yield 'number', float(number)
+        elif string:
+            s, pos = scanstring(buf, pos)
+            yield ('map_key' if key else 'string'), s
+            key = False
+        elif c == ',':
+            key = bool(containers) and containers[-1]
+        elif c != ':':
+            if c == '{':
+                containers.append(True)
+                key = True
+            elif c == '[':
+                containers.append(False)
+            else:
+                containers.pop()
+                key = False
+            yield structure[c], None
+
+def build(events):
+    """Return the document of the given parser events (see iter_events). 
+    The open objects and arrays are kept on an explicit stack, hence 
+    documents of any depth are built."""
+    # The open objects and arrays with the key of their next value.
+    stack = []
+    for event, value in events:
+        if event == 'map_key':
+            stack[-1][1] = value
+            continue
+        if event == 'end_map' or event == 'end_array':
+            value = stack.pop()[0]
+            if not stack:
+                return value
+            continue
+        if event == 'start_map':
+            value = {}
+        elif event == 'start_array':
+            value = []
+        if not stack:
+            if event != 'start_map' and event != 'start_array':
+                return value
+        else:
+            container, key = stack[-1]
+            if key is None:
+                container.append(value)
+            else:
+                container[key] = value
+        if event == 'start_map' or event == 'start_array':
+            stack.append([value, None])
+    raise ValueError('Document ends before its closing bracket.')
@@ -0,0 +1,496 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""jsonstats.py: Statistics on the object and array fanout, the type 
+distribution, the number of nodes, and the depth of JSON documents. The 
+statistics of a record are collected by analyze_record() and summarized over 
+a collection by Statistics. All statistics are kept as running summaries, such 
+that the memory does not grow with the size of a record or collection."""
+
+import sys
+import math
+from collections import Counter
+from jsontree import walk, OBJECT, ARRAY, KEY, VALUE
+
+type_name = ["objects", " arrays", "   keys", " values"]
+# Node types of the parser events (see jsonparse.iter_events), all other 
+# events but the ends of objects and arrays are values.
+kinds = {'start_map': OBJECT, 'start_array': ARRAY, 'map_key': KEY}
+
+def add_exact(partials, x):
+    """Add the float x to the exact sum given as list of non-overlapping 
+    partial sums (Shewchuk's algorithm, see math.fsum)."""
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+        x = hi
+    partials[i:] = [x]
+
+class Summary:
+    """Running count, sum, minimum, and maximum of a metric. If values is 
+    set, the frequency of every value is counted as well. For the integer 
+    metrics of a collection this gives exact quantiles with memory bounded 
+    by the number of distinct values.
+
+    Floats are summed exactly, such that summaries can be merged in any 
+    order with the same result."""
+
+    def __init__(self, values=False):
+        self.count = 0
+        self.sum = 0
+        self.partials = []
+        self.min = None
+        self.max = None
+        self.values = Counter() if values else None
+
+    def add(self, x):
+        self.count += 1
+        if type(x) is float:
+            add_exact(self.partials, x)
+        else:
+            self.sum += x
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        if self.values is not None:
+            self.values[x] += 1
+
+    def merge(self, other):
+        """Add all values of the summary other."""
+        self.count += other.count
+        self.sum += other.sum
+        for x in other.partials:
+            add_exact(self.partials, x)
+        if other.min is not None and (self.min is None or 
+                other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or 
+                other.max > self.max):
+            self.max = other.max
+        if self.values is not None:
+            self.values.update(other.values)
+
+    def avg(self):
+        if self.partials:
+            return math.fsum(self.partials + [self.sum])/self.count
+        return self.sum/self.count
+
+    def quantile(self, q):
+        """Return the smallest value such that at least a fraction q of all 
+        values is less or equal (nearest rank)."""
+        rank = max(1, math.ceil(q*self.count))
+        seen = 0
+        for x in sorted(self.values):
+            seen += self.values[x]
+            if seen >= rank:
+                return x
+
+class Histogram:
+    """Counts of non-negative integers in fixed bins of exponentially 
+    growing width: bin 0 holds 0, and bin i > 0 holds the values from 
+    2^(i-1) to 2^i - 1. Histograms of parts of a collection are merged by 
+    adding their counts."""
+
+    def __init__(self):
+        self.counts = []
+
+    def add(self, x, count=1):
+        counts = self.counts
+        b = x.bit_length()
+        if len(counts) <= b:
+            counts.extend([0]*(b + 1 - len(counts)))
+        counts[b] += count
+
+    def merge(self, other):
+        """Add all counts of the histogram other."""
+        for b, count in enumerate(other.counts):
+            if count:
+                self.add((1 << b) >> 1, count)
+
+    def bins(self):
+        """Yield the lowest and highest value and the count of each bin up 
+        to the last non-empty one."""
+        for b, count in enumerate(self.counts):
+            yield (1 << b) >> 1, (1 << b) - 1, count
+
+# Histograms of Statistics: over the records (number of nodes and maximum 
+# depth), and over the objects and arrays of all records (fanout).
+histogram_name = ["#nodes per record", "depth maximum", "object outdegree", 
+                  "array outdegree"]
+
+# Per-record statistics (see record_row) as NumPy dtype description.
+record_fields = [('nodes', '<u4'), ('depth', '<u4'), ('objects', '<u4'), 
+        ('arrays', '<u4'), ('keys', '<u4'), ('values', '<u4'), 
+        ('object_fanout_min', '<u4'), ('object_fanout_avg', '<f8'), 
+        ('object_fanout_max', '<u4'), ('array_fanout_min', '<u4'), 
+        ('array_fanout_avg', '<f8'), ('array_fanout_max', '<u4')]
+
+class RecordStats:
+    """Statistics of a single record: the number of nodes per type, the 
+    number of nodes per level, and the fanout of objects and arrays. If 
+    fanouts is set, the frequency of each fanout is counted as well (for 
+    histograms)."""
+
+    def __init__(self, fanouts=False):
+        self.type_count = [0, 0, 0, 0]
+        self.depth = []
+        self.object_degree = Summary(fanouts)
+        self.array_degree = Summary(fanouts)
+
+    def nodes(self):
+        return sum(self.type_count)
+
+    def enter(self, kind, node, parent, slot, level):
+        """Callback for jsontree.walk that counts a node. The key of a 
+        key-value pair is one level below its object and its value two 
+        levels below."""
+        depth = self.depth
+        if len(depth) < level + 1:
+            depth.append(0)
+        self.type_count[kind] += 1
+        depth[level] += 1
+
+        if kind == OBJECT:
+            self.object_degree.add(len(node))
+            # Increase depth for keys of a JSON.
+            if len(depth) <= level + 1:
+                depth.append(0)
+        elif kind == ARRAY:
+            self.array_degree.add(len(node))
+
+def analyze(x, level, stats):
+    """Recursively add the nodes of x at the given level to stats."""
+    # increment statistics on nodes with certain nesting level
+    depth = stats.depth
+    if len(depth) < level + 1:
+        depth.append(0)
+
+    if isinstance(x, dict): # OBJECT
+        stats.type_count[0] += 1
+        depth[level] += 1
+        
+        stats.object_degree.add(len(x))
+        # Increase depth for keys of a JSON.
+        if len(depth) <= level + 1:
+            depth.append(0)
+
+        if x != {}:
+            for k, v in x.items():
+                stats.type_count[2] += 1
+                depth[level+1] += 1
+                analyze(v, level + 2, stats)
+    elif isinstance(x, list): # ARRAY
+        stats.type_count[1] += 1
+        depth[level] += 1
+        
+        stats.array_degree.add(len(x))
+
+        if x != []:
+            for l in x:
+                analyze(l, level + 1, stats)
+    else: # VALUE
+        stats.type_count[3] += 1
+        depth[level] += 1
+
+    return
+
+def analyze_record(x, fanouts=False):
+    """Return the statistics of the record x (see RecordStats). Recursion is 
+    faster than the explicit stack of jsontree.walk, hence the latter is 
+    only used for records nested deeper than the recursion limit."""
+    stats = RecordStats(fanouts)
+    try:
+        analyze(x, 0, stats)
+    except RecursionError:
+        stats = RecordStats(fanouts)
+        walk(x, stats.enter)
+
+    return stats
+
+def iter_event_stats(events, ndjson=False, fanouts=False):
+    """Yield the statistics of each record of a collection given as parser 
+    events (see jsonparse.iter_events), without building the records. The 
+    records are the elements of an array or, if ndjson is set, the documents 
+    in a row. The open objects and arrays of a record are kept on an 
+    explicit stack, hence records of any depth are analyzed."""
+    # Type, level, and number of children of the open objects and arrays.
+    stack = []
+    stats = None
+    collection = ndjson
+    for event, value in events:
+        if not collection:
+            if event != 'start_array':
+                raise ValueError('Collection is not surrounded by an array.')
+            collection = True
+            continue
+        if stats is None:
+            if event == 'end_array' and not ndjson:
+                return
+            stats = RecordStats(fanouts)
+
+        if event == 'end_map' or event == 'end_array':
+            kind, level, count = stack.pop()
+            if kind == OBJECT:
+                stats.object_degree.add(count)
+            else:
+                stats.array_degree.add(count)
+        else:
+            # Keys are one level below their object and values two levels.
+            if not stack:
+                level = 0
+            elif event == 'map_key':
+                stack[-1][2] += 1
+                level = stack[-1][1] + 1
+            elif stack[-1][0] == ARRAY:
+                stack[-1][2] += 1
+                level = stack[-1][1] + 1
+            else:
+                level = stack[-1][1] + 2
+            kind = kinds.get(event, VALUE)
+            depth = stats.depth
+            while len(depth) <= level:
+                depth.append(0)
+            stats.type_count[kind] += 1
+            depth[level] += 1
+            if kind == OBJECT:
+                # Increase depth for keys of a JSON.
+                if len(depth) <= level + 1:
+                    depth.append(0)
+                stack.append([kind, level, 0])
+            elif kind == ARRAY:
+                stack.append([kind, level, 0])
+
+        if not stack:
+            yield stats
+            stats = None
+
+def record_row(stats):
+    """Return the per-record statistics of a record in the order of 
+    record_fields. Records without objects (arrays) have fanout 0."""
+    row = [stats.nodes(), len(stats.depth) - 1] + stats.type_count
+    for degree in (stats.object_degree, stats.array_degree):
+        if degree.count == 0:
+            row += [0, 0.0, 0]
+        else:
+            row += [degree.min, degree.avg(), degree.max]
+    return row
+
+def tree_stats(parents, kinds, fanouts=False):
+    """Return the statistics of a record stored as parent array and node 
+    types, both in postorder (see treefile.py)."""
+    stats = RecordStats(fanouts)
+    n = len(parents)
+    if n == 0:
+        return stats
+    fanout = [0]*n
+    level = [0]*n
+    # Parents follow their children in postorder, hence levels are known 
+    # when walking the nodes backwards.
+    for i in range(n - 2, -1, -1):
+        fanout[parents[i]] += 1
+        level[i] = level[parents[i]] + 1
+
+    depth = stats.depth
+    type_count = stats.type_count
+    for i in range(n - 1, -1, -1):
+        kind = kinds[i]
+        l = level[i]
+        type_count[kind] += 1
+        while len(depth) <= l:
+            depth.append(0)
+        depth[l] += 1
+        if kind == OBJECT:
+            stats.object_degree.add(fanout[i])
+            # Increase depth for keys of a JSON.
+            if len(depth) <= l + 1:
+                depth.append(0)
+        elif kind == ARRAY:
+            stats.array_degree.add(fanout[i])
+
+    return stats
+
+class Statistics:
+    """Statistics of a collection, summarized over the records added. If 
+    quantiles is set, the report includes quantiles of the integer metrics. 
+    If histograms is set, the report includes histograms (see 
+    histogram_name), which require the records to count their fanouts (see 
+    RecordStats)."""
+
+    # Quantiles that are reported.
+    quantiles = [0.5, 0.9, 0.99]
+
+    def __init__(self, quantiles=False, histograms=False):
+        self.records = 0
+        self.histograms = [Histogram() for name in histogram_name] \
+                if histograms else None
+        self.nodes = Summary(quantiles)
+        self.types = [Summary(quantiles) for i in range(len(type_name))]
+        self.depth_max = Summary(quantiles)
+        self.obj_deg_min = Summary(quantiles)
+        self.obj_deg_avg = Summary()
+        self.obj_deg_max = Summary(quantiles)
+        self.arr_deg_min = Summary(quantiles)
+        self.arr_deg_avg = Summary()
+        self.arr_deg_max = Summary(quantiles)
+
+    def merge(self, other):
+        """Add the statistics of all records of other, e.g., the statistics 
+        of another part of the same collection."""
+        self.records += other.records
+        self.nodes.merge(other.nodes)
+        for i in range(len(self.types)):
+            self.types[i].merge(other.types[i])
+        self.depth_max.merge(other.depth_max)
+        self.obj_deg_min.merge(other.obj_deg_min)
+        self.obj_deg_avg.merge(other.obj_deg_avg)
+        self.obj_deg_max.merge(other.obj_deg_max)
+        self.arr_deg_min.merge(other.arr_deg_min)
+        self.arr_deg_avg.merge(other.arr_deg_avg)
+        self.arr_deg_max.merge(other.arr_deg_max)
+        if self.histograms is not None:
+            for mine, theirs in zip(self.histograms, other.histograms):
+                mine.merge(theirs)
+
+    def add(self, stats):
+        """Add the statistics of a record."""
+        self.records += 1
+        self.nodes.add(stats.nodes())
+        for i in range(len(stats.type_count)):
+            self.types[i].add(stats.type_count[i])
+
+        # store depth data
+        self.depth_max.add(len(stats.depth)-1)
+
+        # store object outdegree data
+        object_degree = stats.object_degree
+        if object_degree.count == 0:
+            self.obj_deg_min.add(0)
+            self.obj_deg_avg.add(0)
+            self.obj_deg_max.add(0)
+        else:
+            self.obj_deg_min.add(object_degree.min)
+            self.obj_deg_avg.add(object_degree.avg())
+            self.obj_deg_max.add(object_degree.max)
+
+        # store array outdegree data
+        array_degree = stats.array_degree
+        if array_degree.count == 0:
+            self.arr_deg_min.add(0)
+            self.arr_deg_avg.add(0)
+            self.arr_deg_max.add(0)
+        else:
+            self.arr_deg_min.add(array_degree.min)
+            self.arr_deg_avg.add(array_degree.avg())
+            self.arr_deg_max.add(array_degree.max)
+
+        # store histogram data
+        if self.histograms is not None:
+            nodes, depth, objects, arrays = self.histograms
+            nodes.add(stats.nodes())
+            depth.add(len(stats.depth)-1)
+            for fanout, count in object_degree.values.items():
+                objects.add(fanout, count)
+            for fanout, count in array_degree.values.items():
+                arrays.add(fanout, count)
+
+    def report(self, out=sys.stdout):
+        """Print the distributions over all records."""
+
+        def line(name, summary, digits=None):
+            low, high = summary.min, summary.max
+            if digits is not None:
+                low, high = round(low, digits), round(high, digits)
+            print(name + ": [" + str(low) + ", " + str(high) + 
+                    "]  -  avg = " + str(round(summary.avg(), 2)), file=out)
+
+        print("GENERAL INFORMATION:", file=out)
+        print("#record: " + str(self.records), file=out)
+        line("#nodes per record", self.nodes)
+        print(file=out)
+
+        print("TYPE distribution:", file=out)
+        for i in range(len(self.types)):
+            line(str(type_name[i]), self.types[i])
+        print(file=out)
+
+        print("DEPTH distribution:", file=out)
+        line("maximum", self.depth_max)
+        print(file=out)
+
+        print("OUTDEGREE distribution OBJECT:", file=out)
+        line("minimum", self.obj_deg_min)
+        line("average", self.obj_deg_avg, 2)
+        line("maximum", self.obj_deg_max)
+        print(file=out)
+
+        print("OUTDEGREE distribution ARRAY:", file=out)
+        line("minimum", self.arr_deg_min)
+        line("average", self.arr_deg_avg, 2)
+        line("maximum", self.arr_deg_max)
+        print(file=out)
+
+        if self.nodes.values is not None:
+            self.report_quantiles(out)
+        if self.histograms is not None:
+            self.report_histograms(out)
+
+        return
+
+    def report_quantiles(self, out=sys.stdout):
+        """Print the quantiles of the integer metrics over all records."""
+
+        def line(name, summary):
+            print(name + ": " + " / ".join(str(summary.quantile(q)) 
+                    for q in self.quantiles), file=out)
+
+        print("QUANTILES (" + " / ".join("p" + str(round(q*100)) 
+                for q in self.quantiles) + "):", file=out)
+        line("#nodes per record", self.nodes)
+        for i in range(len(self.types)):
+            line(str(type_name[i]), self.types[i])
+        line("depth maximum", self.depth_max)
+        line("object outdegree minimum", self.obj_deg_min)
+        line("object outdegree maximum", self.obj_deg_max)
+        line("array outdegree minimum", self.arr_deg_min)
+        line("array outdegree maximum", self.arr_deg_max)
+        print(file=out)
+
+        return
+
+    def report_histograms(self, out=sys.stdout):
+        """Print the histograms, one line per bin: [low, high]: count."""
+
+        print("HISTOGRAMS:", file=out)
+        for name, histogram in zip(histogram_name, self.histograms):
+            print(name + ":", file=out)
+            for low, high, count in histogram.bins():
+                print("  [" + str(low) + ", " + str(high) + "]: " + 
+                        str(count), file=out)
+        print(file=out)
+
+        return
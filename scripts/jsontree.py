@@ -0,0 +1,301 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""jsontree.py: Shared traversal of the tree that represents a JSON document. 
+The tree is walked with an explicit stack, such that documents of arbitrary 
+nesting depth can be processed without recursion. Collections of documents 
+are read record by record."""
+
+import json
+import re
+from collections import deque
+from itertools import islice
+
+# JSON         | Python | Tree
+# -------------+--------+------------------------------------------------
+# object       | dict   | OBJECT node with one KEY node per key-value pair
+# array        | list   | ARRAY node with one child per element
+# string       | str    | VALUE node
+# number(int)  | int    | VALUE node
+# number(real) | float  | VALUE node
+# true         | True   | VALUE node
+# false        | False  | VALUE node
+# null         | None   | VALUE node
+#
+# The value of a key-value pair is the only child of its KEY node. Optionally, 
+# every array element is placed below an ORDER node (array order node).
+
+# Node kinds. The first four match the type order of analyze-json.py.
+OBJECT = 0
+ARRAY = 1
+KEY = 2
+VALUE = 3
+ORDER = 4
+
+kinds = {dict: OBJECT, list: ARRAY}
+
+def kind_of(x):
+    """Return the kind of node that represents the JSON value x."""
+    return kinds.get(type(x), VALUE)
+
+def walk(doc, enter=None, leave=None, sort_keys=False, order_nodes=False):
+    """Traverse the tree of the JSON document doc in preorder.
+
+    The callbacks enter and leave are called before and after the children of 
+    a node are visited, both as callback(kind, node, parent, slot, level). For 
+    objects, arrays and values, node is the JSON value itself, for keys it is 
+    the key, and for array order nodes the position in the array. In all 
+    cases, parent[slot] is the JSON value at or below the node (parent and 
+    slot are None for the root). The level of the root is 0.
+
+    If enter returns a true value, the traversal stops and True is returned.
+    If sort_keys is set, the keys of an object are visited in sorted order."""
+
+    stack = [(kind_of(doc), doc, None, None, 0)]
+    push = stack.append
+    pop = stack.pop
+    get = kinds.get
+
+    while stack:
+        kind, node, parent, slot, level = pop()
+        # Leave nodes once all their children have been visited.
+        if kind < 0:
+            leave(~kind, node, parent, slot, level)
+            continue
+        if enter is not None and enter(kind, node, parent, slot, level):
+            return True
+        # Values have no children and are left right away.
+        if kind == VALUE:
+            if leave is not None:
+                leave(kind, node, parent, slot, level)
+            continue
+        if leave is not None:
+            push((~kind, node, parent, slot, level))
+
+        # Push the children in reverse order to visit them in order.
+        level += 1
+        if kind == OBJECT:
+            keys = sorted(node) if sort_keys else list(node)
+            for key in reversed(keys):
+                push((KEY, key, node, key, level))
+        elif kind == ARRAY:
+            if order_nodes:
+                for pos in range(len(node) - 1, -1, -1):
+                    push((ORDER, pos, node, pos, level))
+            else:
+                for pos in range(len(node) - 1, -1, -1):
+                    val = node[pos]
+                    push((get(type(val), VALUE), val, node, pos, level))
+        else: # KEY, ORDER
+            val = parent[slot]
+            push((get(type(val), VALUE), val, parent, slot, level))
+
+    return False
+
+def tree_size(doc, order_nodes=False):
+    """Return the number of nodes of the tree of the JSON document doc."""
+    size = 0
+    stack = [doc]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        x = pop()
+        size += 1
+        t = type(x)
+        if t is dict:
+            # Count the keys and visit the values.
+            size += len(x)
+            for val in x.values():
+                push(val)
+        elif t is list:
+            if order_nodes:
+                size += len(x)
+            for val in x:
+                push(val)
+
+    return size
+
+# Whitespace between the records of a collection.
+whitespace = re.compile(r'[ \t\n\r]*')
+# Text up to the next bracket, skipping over complete strings, such that 
+# brackets within strings do not count.
+no_bracket = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+# A complete string.
+string = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+# End of a number or literal.
+scalar_end = re.compile(r'[ \t\n\r,\]]')
+# Separator between two records of an array.
+separator = re.compile(r'[ \t\n\r]*,[ \t\n\r]*')
+# Number of characters of the records of an array that are parsed at once. 
+# Larger batches are slower since the garbage collector traverses the 
+# parsed records more often.
+batch_chars = 1 << 14
+# Change of the nesting depth per bracket.
+nesting = {'{': 1, '[': 1, '}': -1, ']': -1}
+
+def record_end(buf, pos):
+    """Return the end of the JSON value that starts at buf[pos] without 
+    parsing it, or None if the value does not end within buf. Objects and 
+    arrays end at their matching bracket, strings at their closing quote, 
+    and numbers and literals before the next whitespace, comma, or closing 
+    bracket. The value is not validated."""
+    c = buf[pos]
+    if c == '{' or c == '[':
+        skip = no_bracket.match
+        n = len(buf)
+        depth = 0
+        while True:
+            pos = skip(buf, pos).end()
+            # The quote of an incomplete string stops the skipping as well.
+            if pos == n or buf[pos] == '"':
+                return None
+            depth += nesting[buf[pos]]
+            pos += 1
+            if depth == 0:
+                return pos
+    if c == '"':
+        m = string.match(buf, pos)
+        return m.end() if m is not None else None
+    m = scalar_end.search(buf, pos)
+    return m.start() if m is not None else None
+
+def iter_records(json_file, ndjson=False, raw=False, chunk_size=1 << 20, 
+        loads=json.loads, resume=False):
+    """Yield the records of a collection one at a time. The collection is 
+    either nested in an array or stored with one JSON document per line 
+    (ndjson). Only the records of the current chunk of the file are kept in 
+    memory. If raw is set, the records are yielded unparsed (i.e., the lines 
+    of an ndjson collection or the text of the elements of an array), 
+    otherwise they are parsed with loads (see jsonparse.py). If resume is set, the file is positioned within the 
+    array, after a record."""
+
+    # Documents per line can be parsed line by line.
+    if ndjson:
+        for line in json_file:
+            if line.strip():
+                yield line if raw else loads(line)
+        return
+
+    # The elements of an array are cut at their end (see record_end) and 
+    # parsed one at a time. Calling loads per record is slow for small 
+    # records, hence batches of records are parsed at once as long as their 
+    # end can be found by the text between the first two records (e.g., 
+    # '},\n{'), or by this text and the first key of the second record (e.g., 
+    # '},{"id"'). A batch is cut at an occurrence of this text (see 
+    # batch_chars). Since parsing starts at a record, the batch only parses 
+    # as array if the cut is between two records. Otherwise, i.e., if the 
+    # text also occurs within records, the next text is tried, and finally 
+    # the records are cut one at a time.
+    patterns = None
+    # Set if the pattern does not occur in the rest of the buffer.
+    exhausted = False
+    buf = json_file.read(chunk_size)
+    pos = whitespace.match(buf).end()
+    # Skip leading whitespace that fills whole chunks.
+    while buf and pos == len(buf):
+        buf = json_file.read(chunk_size)
+        pos = whitespace.match(buf).end()
+    eof = buf == ''
+    if not resume:
+        if buf[pos:pos+1] != '[':
+            raise ValueError('Collection is not surrounded by an array.')
+        pos += 1
+
+    while True:
+        pos = whitespace.match(buf, pos).end()
+        # Refill the buffer once all of it has been consumed.
+        if pos == len(buf):
+            if eof:
+                raise ValueError('Collection ends before closing array.')
+            buf = json_file.read(chunk_size)
+            eof = buf == ''
+            pos = 0
+            exhausted = False
+            continue
+        if buf[pos] == ']':
+            return
+        if buf[pos] == ',':
+            pos += 1
+            continue
+
+        if patterns and not exhausted and not raw:
+            pattern = patterns[0]
+            cut = buf.find(pattern, min(pos + batch_chars, len(buf)))
+            if cut < 0:
+                cut = buf.rfind(pattern, pos)
+            exhausted = cut < 0
+            if cut >= 0:
+                try:
+                    records = loads('[' + buf[pos:cut + 1] + ']')
+                except ValueError:
+                    patterns.pop(0)
+                else:
+                    yield from records
+                    pos = cut + 1
+                    continue
+
+        # If the record is not complete yet, append the next chunk and 
+        # retry. A number that reaches the end of the buffer may be 
+        # truncated as well.
+        end = record_end(buf, pos)
+        if end is None:
+            if eof:
+                raise ValueError('Collection ends before closing array.')
+            # Grow the read size with the record to avoid scanning large 
+            # records over and over again.
+            more = json_file.read(max(chunk_size, len(buf) - pos))
+            buf = buf[pos:] + more
+            eof = more == ''
+            pos = 0
+            exhausted = False
+            continue
+
+        # Take the patterns from the first record that is followed by 
+        # another one in the buffer.
+        m = separator.match(buf, end) if patterns is None else None
+        if m is not None and m.end() < len(buf):
+            patterns = []
+            if buf[end - 1] in '}]' and buf[m.end()] == buf[pos]:
+                patterns.append(buf[end - 1:m.end() + 1])
+                key = None
+                if buf[pos] == '{':
+                    key = string.match(buf, 
+                            whitespace.match(buf, m.end() + 1).end())
+                if key is not None:
+                    patterns.append(buf[end - 1:key.end()])
+        yield buf[pos:end] if raw else loads(buf[pos:end])
+        pos = end
+
+def map_batches(pool, func, data, jobs, batch_size, *args):
+    """Apply func(batch, *args) to batches of batch_size records of data in 
+    the given multiprocessing pool and yield the results in order. At most 
+    two batches per process are in flight, such that a streamed collection 
+    is never read ahead completely."""
+    data = iter(data)
+    pending = deque()
+    while True:
+        batch = list(islice(data, batch_size))
+        if batch:
+            pending.append(pool.apply_async(func, (batch,) + args))
+        if pending and (not batch or len(pending) >= 2 * jobs):
+            yield pending.popleft().get()
+        elif not batch:
+            return
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""lookup-filter.py: Run the size filter of threshold lookups on a document 
+collection. For every query tree q and threshold tau selected by 
+get-query-trees.py, all trees t with |size(q) - size(t)| <= tau are 
+candidates. The filter is evaluated with NumPy over the size array of the 
+collection, and the number of candidates and the filter time are reported 
+per query and threshold."""
+
+import os
+import sys
+import time
+from argparse import ArgumentParser
+import numpy as np
+from bracketfile import iter_node_counts, has_index
+from treefile import is_tree_file, iter_tree_sizes
+from compressed import open_file, output_compression
+
+def input_format(filename):
+    """Return the format of a collection by its content (tree file) or by 
+    its suffix without compression suffix: 'npy', 'sizes', 'tree', 
+    'bracket', or None if it is unknown."""
+    if is_tree_file(filename):
+        return 'tree'
+    name = filename
+    if output_compression(name):
+        name = os.path.splitext(name)[0]
+    suffix = os.path.splitext(name)[1]
+    if suffix in ('.npy', '.sizes', '.bracket'):
+        return suffix[1:]
+    return None
+
+def load_sizes(filename):
+    """Return the number of nodes per record of a collection, given as 
+    features (.npy, see preprocess-json.py), sizes (.sizes, one per line), 
+    tree file, or bracket file (.bracket, with or without offset index). 
+    Sizes and bracket files may be compressed (see compressed.py)."""
+    format = input_format(filename)
+    if format == 'npy':
+        sizes = np.load(filename)
+        if sizes.dtype.names:
+            sizes = sizes['nodes']
+    elif format == 'sizes':
+        with open_file(filename) as sizes_file:
+            sizes = np.loadtxt(sizes_file, dtype=np.int64, ndmin=1)
+    elif format == 'tree':
+        sizes = np.fromiter(iter_tree_sizes(filename), dtype=np.int64)
+    elif format == 'bracket' and has_index(filename):
+        # See bracketfile.index_entry.
+        sizes = np.fromfile(filename + '.idx', 
+                dtype=[('offset', '<u8'), ('nodes', '<u4')])['nodes']
+    elif format == 'bracket':
+        sizes = np.fromiter(iter_node_counts(filename), dtype=np.int64)
+    else:
+        raise ValueError(filename + ': unknown format of collection.')
+    # Sizes are signed such that their differences do not wrap around.
+    return sizes.astype(np.int64)
+
+def read_queries(query_file):
+    """Return the query trees per collection from the output of 
+    get-query-trees.py. Each collection starts with the list of cut points, 
+    followed by one line per query: ID, (size), and thresholds."""
+    collections = []
+    for line in query_file:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('['):
+            collections.append([])
+            continue
+        idx, size, thresholds = (line.split('\t') + [''])[:3]
+        collections[-1].append((int(idx), int(size.strip('()')), 
+                [int(tau) for tau in thresholds.split()]))
+    return collections
+
+def size_filter(sizes, size, tau):
+    """Return the IDs of the candidates of a query of the given size."""
+    return np.flatnonzero(np.abs(sizes - size) <= tau)
+
+def main():
+    parser = ArgumentParser(description='Input parameters for the size \
+        filter of threshold lookups.')
+    parser.add_argument('-i', '--inputfiles', nargs='+', type=str, 
+        required=True, help='<Required> Filename/-path of the collections, \
+        in the order given to get-query-trees.py (.npy features, .sizes, \
+        tree file, or .bracket file; sizes and bracket files optionally \
+        compressed).')
+    parser.add_argument('-q', '--queries', type=str, default='-',
+        help='Filename/-path of the output of get-query-trees.py \
+        (default=stdin).')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+        help='Number of repetitions per query and threshold, the minimum \
+        time is reported (default=1).')
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat must be positive')
+    for file in args.inputfiles:
+        if input_format(file) is None:
+            parser.error(file + ': unknown format, expected .npy, .sizes, '
+                    'tree file, or .bracket')
+
+    if args.queries == '-':
+        collections = read_queries(sys.stdin)
+    else:
+        with open(args.queries) as query_file:
+            collections = read_queries(query_file)
+    if len(collections) != len(args.inputfiles):
+        parser.error(str(len(collections)) + ' query sets for ' + 
+                str(len(args.inputfiles)) + ' input files')
+
+    print("file\tquery\tsize\ttau\tcandidates\tselectivity\ttime[us]")
+    for file, queries in zip(args.inputfiles, collections):
+        start = time.perf_counter()
+        sizes = load_sizes(file)
+        load_time = time.perf_counter() - start
+        records = len(sizes)
+
+        pairs = 0
+        candidates = 0
+        filter_time = 0
+        for idx, size, thresholds in queries:
+            for tau in thresholds:
+                best = None
+                for r in range(args.repeat):
+                    start = time.perf_counter()
+                    result = size_filter(sizes, size, tau)
+                    elapsed = time.perf_counter() - start
+                    if best is None or elapsed < best:
+                        best = elapsed
+                pairs += 1
+                candidates += len(result)
+                filter_time += best
+                print(file + "\t" + str(idx) + "\t" + str(size) + "\t" + 
+                        str(tau) + "\t" + str(len(result)) + "\t" + 
+                        str(round(len(result)/max(records, 1), 6)) + "\t" + 
+                        str(round(best*1e6, 1)))
+
+        # Summary of the collection as comment lines.
+        print("# " + file + ": " + str(records) + " records, loaded in " + 
+                str(round(load_time, 3)) + " s")
+        if pairs:
+            print("# " + file + ": " + str(pairs) + " lookups, " + 
+                    str(round(candidates/pairs, 1)) + " candidates and " + 
+                    str(round(candidates/pairs/max(records, 1), 6)) + 
+                    " selectivity on average, " + 
+                    str(round(pairs/filter_time)) + " lookups/s, " + 
+                    str(round(pairs*records/filter_time/1e6, 1)) + 
+                    " M records/s")
+
+    return
+
+if __name__ == '__main__':
+    main()
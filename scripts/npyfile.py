@@ -0,0 +1,94 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""npyfile.py: Writing of record arrays in the NumPy .npy format without 
+depending on NumPy. The files are loaded with numpy.load(filename)."""
+
+import re
+import struct
+
+MAGIC = b'\x93NUMPY\x01\x00'
+# Struct codes of the supported (little-endian) field types.
+codes = {'<i4': 'i', '<u4': 'I', '<i8': 'q', '<u8': 'Q', '<f4': 'f', 
+         '<f8': 'd', '|u1': 'B'}
+
+def header(descr, records, length=0):
+    """Return the .npy header of records elements of the given NumPy dtype 
+    description, padded to at least length bytes."""
+    text = ("{'descr': " + repr(descr) + ", 'fortran_order': False, " + 
+            "'shape': (" + str(records) + ",), }")
+    # The header ends with a newline and keeps the data 64-byte aligned.
+    size = max(len(MAGIC) + 2 + len(text) + 1, length)
+    size += -size % 64
+    text += ' '*(size - len(MAGIC) - 2 - len(text) - 1) + '\n'
+    return MAGIC + struct.pack('<H', len(text)) + text.encode('latin1')
+
+class NpyWriter:
+    """Writes a one-dimensional record array of the given dtype description, 
+    e.g., [('nodes', '<u4'), ('sketch', '<u4', (16,))], one record per call 
+    of write. The number of records is filled in on close. If append is set, 
+    the records are appended to an existing file written by NpyWriter."""
+
+    def __init__(self, filename, descr, append=False):
+        self.descr = descr
+        fmt = '<'
+        for field in descr:
+            count = field[2][0] if len(field) > 2 else 1
+            fmt += str(count) + codes[field[1]]
+        self.record = struct.Struct(fmt)
+        self.records = 0
+        # Reserve space for the largest record count.
+        self.length = len(header(descr, 2**64))
+        if append:
+            self.file = open(filename, 'r+b', buffering=1 << 20)
+            text = self.file.read(self.length).decode('latin1')
+            if (not text.startswith(MAGIC.decode('latin1')) or 
+                    repr(descr) not in text):
+                raise ValueError(filename + ' has another record type.')
+            self.records = int(re.search(r"'shape': \((\d+),\)", 
+                text).group(1))
+            self.file.seek(0, 2)
+        else:
+            self.file = open(filename, 'wb', buffering=1 << 20)
+            self.file.write(header(descr, 0, self.length))
+
+    def write(self, values):
+        """Write a record given as sequence of field values, arrays of a 
+        field are given as list."""
+        flat = []
+        for value in values:
+            if type(value) is list:
+                flat.extend(value)
+            else:
+                flat.append(value)
+        self.file.write(self.record.pack(*flat))
+        self.records += 1
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(header(self.descr, self.records, self.length))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,67 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""pairfile.py: Reading and writing of the document pairs generated by 
+generate-json.py --diff. Two formats are supported:
+
+  pairs: one JSON object per line, {"doc": ..., "diff": ..., "distance": d}
+  lines: three lines per pair, the document, the edited document, and the 
+         distance (the default output of generate-json.py)
+
+Pairs are read one at a time, such that collections of any size can be 
+processed in constant memory."""
+
+import json
+from compressed import open_file
+
+def format_pair(doc, diff, distance):
+    """Return the line of a pair in the pairs format. The documents doc and 
+    diff are given as JSON text (e.g., from json.dumps), such that a document 
+    can be encoded before it is edited in place."""
+    return ('{"doc": ' + doc + ', "diff": ' + diff + ', "distance": ' + 
+        str(distance) + '}\n')
+
+def iter_pairs(pair_file, lines=False):
+    """Yield the pairs of an open file as triples (doc, diff, distance). The 
+    file is in the pairs format, or in the lines format if lines is set."""
+    loads = json.loads
+    if not lines:
+        for line in pair_file:
+            if line.strip():
+                pair = loads(line)
+                yield pair["doc"], pair["diff"], pair["distance"]
+        return
+
+    # Skip empty lines, e.g., a trailing newline.
+    records = (line for line in pair_file if line.strip())
+    for doc in records:
+        try:
+            diff = next(records)
+            distance = next(records)
+        except StopIteration:
+            raise ValueError('Incomplete pair at the end of the file.')
+        yield loads(doc), loads(diff), int(distance)
+
+def read_pairs(filename, lines=False):
+    """Yield the pairs of the given file (see iter_pairs), which may be 
+    compressed (see compressed.py)."""
+    with open_file(filename) as pair_file:
+        yield from iter_pairs(pair_file, lines)
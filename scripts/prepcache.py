@@ -0,0 +1,150 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""prepcache.py: Cache of preprocess-json.py. The cache <output>.cache 
+records the content hash of the raw collection, the options of the run, and 
+the state of the outputs. A collection that did not change is not processed 
+again. If records were appended to a collection, only the new records are 
+processed and appended to the outputs.
+
+An append is detected by the hash of the part of the old collection that 
+ends after its last record, i.e., at the end of the last record of an array 
+or at the end of the last line of an ndjson collection, and by a separator 
+that starts the next record after it (see continues)."""
+
+import os
+import pickle
+import hashlib
+from compressed import compression
+
+# Bytes read at once while hashing.
+chunk_size = 1 << 20
+
+def resume_point(filename, ndjson):
+    """Return the offset after the last record of a collection, where 
+    appended records start, or None if the collection does not end as 
+    expected (closing bracket or newline). Appends to compressed collections 
+    are not detected."""
+    if compression(filename):
+        return None
+    size = os.path.getsize(filename)
+    start = max(0, size - chunk_size)
+    with open(filename, 'rb') as raw_file:
+        raw_file.seek(start)
+        tail = raw_file.read()
+    if ndjson:
+        return size if tail.endswith(b'\n') else None
+    tail = tail.rstrip(b' \t\n\r')
+    if not tail.endswith(b']'):
+        return None
+    # Whitespace before the closing bracket does not belong to the records.
+    return start + len(tail[:-1].rstrip(b' \t\n\r'))
+
+def continues(filename, resume, ndjson):
+    """Return True if the collection continues with a new record at the 
+    resume point of an earlier run. In an array, the next byte other than 
+    whitespace must be a comma, otherwise the last record itself was 
+    changed (e.g., the number 3 to 34). In an ndjson collection, the resume 
+    point must follow a newline."""
+    with open(filename, 'rb') as raw_file:
+        if ndjson:
+            if resume == 0:
+                return False
+            raw_file.seek(resume - 1)
+            return raw_file.read(1) == b'\n'
+        raw_file.seek(resume)
+        while True:
+            data = raw_file.read(chunk_size)
+            if not data:
+                return False
+            data = data.lstrip(b' \t\n\r')
+            if data:
+                return data.startswith(b',')
+
+def digest(filename, cuts=()):
+    """Return the SHA-256 digest of a file and a dictionary with the digest 
+    of its first n bytes for each n in cuts (if the file has n bytes)."""
+    sha = hashlib.sha256()
+    prefixes = {}
+    cuts = sorted(cuts)
+    pos = 0
+    with open(filename, 'rb') as raw_file:
+        while True:
+            # Stop at the next cut to take its digest.
+            n = chunk_size
+            while cuts and cuts[0] <= pos:
+                if cuts[0] == pos:
+                    prefixes[pos] = sha.copy().hexdigest()
+                cuts.pop(0)
+            if cuts:
+                n = min(n, cuts[0] - pos)
+            data = raw_file.read(n)
+            if not data:
+                break
+            sha.update(data)
+            pos += len(data)
+    return sha.hexdigest(), prefixes
+
+def file_size(filename):
+    """Return the size of a file, or None if it does not exist."""
+    return os.path.getsize(filename) if os.path.exists(filename) else None
+
+class Cache:
+    """State of a preprocessed collection: the options of the run, the 
+    digest of the collection and of its part up to the resume point, the 
+    sizes of the outputs, and the statistics and number of the records."""
+
+    def __init__(self, options, outputs):
+        self.options = options
+        self.outputs = outputs
+        self.sha256 = None
+        self.resume = None
+        self.resume_sha256 = None
+        self.sizes = None
+        self.records = 0
+        self.statistics = None
+
+    def output_sizes(self):
+        return {name: file_size(name) for name in self.outputs}
+
+    def matches(self, other):
+        """Return True if other was a run with the same options whose 
+        outputs are still unchanged."""
+        return (other is not None and other.options == self.options and 
+                other.outputs == self.outputs and 
+                other.sizes == self.output_sizes())
+
+def load(filename):
+    """Return the cache stored in the given file, or None."""
+    try:
+        with open(filename, 'rb') as cache_file:
+            cache = pickle.load(cache_file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    return cache if isinstance(cache, Cache) else None
+
+def store(filename, cache):
+    """Store the cache in the given file once all outputs are written."""
+    cache.sizes = cache.output_sizes()
+    with open(filename + '.tmp', 'wb') as cache_file:
+        pickle.dump(cache, cache_file)
+    os.replace(filename + '.tmp', filename)
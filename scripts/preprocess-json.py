@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""preprocess-json.py: Converts a collection of JSON documents into bracket 
+notation and analyzes it in a single pass. Each record is parsed and 
+traversed once to write its bracket notation, to update the statistics 
+reported by analyze-json.py, and to record its number of nodes as needed by 
+get-query-trees.py."""
+
+import io
+import sys
+from argparse import ArgumentParser
+import json2bracket
+from json2bracket import escape, value2bracket, convert_deep, open_output
+from jsontree import walk, iter_records
+from jsonstats import RecordStats, Statistics
+from bracketfile import IndexWriter, remove_index
+from npyfile import NpyWriter
+from jsonparse import get_loads, available
+import prepcache
+from compressed import open_file, output_compression
+from instrument import Progress, no_lap, profile
+from zlib import crc32
+
+# JSON         | Python
+# -------------+--------
+# object       | dict
+# array        | list
+# string       | str
+# number(int)  | int
+# number(real) | float
+# true         | True
+# false        | False
+# null         | None
+
+sort_key = False
+
+def convert_analyze(x, out, stats, level):
+    """Append the bracket notation of x to the list out and add the nodes of 
+    x at the given level to stats."""
+    global sort_key
+    append = out.append
+    depth = stats.depth
+    if len(depth) < level + 1:
+        depth.append(0)
+    depth[level] += 1
+
+    t = type(x)
+    if t is dict: # OBJECT
+        stats.type_count[0] += 1
+        stats.object_degree.add(len(x))
+        # Increase depth for keys of a JSON.
+        if len(depth) <= level + 1:
+            depth.append(0)
+
+        append('{\\{\\}')
+        items = sorted(x.items()) if sort_key else x.items()
+        for key, val in items:
+            stats.type_count[2] += 1
+            depth[level+1] += 1
+            append('{"' + escape(key) + '":')
+            convert_analyze(val, out, stats, level + 2)
+            append('}')
+        append('}')
+    elif t is list: # ARRAY
+        stats.type_count[1] += 1
+        stats.array_degree.add(len(x))
+
+        append('{[]')
+        for val in x:
+            convert_analyze(val, out, stats, level + 1)
+        append('}')
+    else: # VALUE
+        stats.type_count[3] += 1
+        append(value2bracket(x))
+
+    return
+
+def feature_descr(bins):
+    """Return the NumPy dtype description of the per-record features with a 
+    label sketch of the given number of bins."""
+    return [('nodes', '<u4'), ('depth', '<u4'), ('objects', '<u4'), 
+            ('arrays', '<u4'), ('keys', '<u4'), ('values', '<u4'), 
+            ('max_fanout', '<u4'), ('labels', '<u4', (bins,))]
+
+def add_labels(tokens, sketch):
+    """Count the labels of a record, given as tokens of its bracket notation, 
+    in the label-frequency sketch. A label is counted in bin crc32(label) 
+    modulo the number of bins."""
+    bins = len(sketch)
+    for token in tokens:
+        if token == '}':
+            continue
+        # Value tokens close their node, the object label ends with a brace.
+        if token[-1] == '}' and token != '{\\{\\}':
+            label = token[1:-1]
+        else:
+            label = token[1:]
+        sketch[crc32(label.encode()) % bins] += 1
+
+def record_features(stats, sketch):
+    """Return the features of a record from its statistics and its label 
+    sketch (see feature_descr)."""
+    max_fanout = max(stats.object_degree.max or 0, 
+            stats.array_degree.max or 0)
+    return [stats.nodes(), len(stats.depth) - 1] + stats.type_count + \
+            [max_fanout, sketch]
+
+def preprocess(x, sketch=None):
+    """Return the bracket notation and the statistics of the record x. 
+    Records nested deeper than the recursion limit are converted and 
+    analyzed with two walks of jsontree.walk instead. If a sketch is given, 
+    the labels of x are counted in it (see add_labels)."""
+    out = []
+    stats = RecordStats()
+    try:
+        convert_analyze(x, out, stats, 0)
+    except RecursionError:
+        out = []
+        stats = RecordStats()
+        convert_deep(x, out)
+        walk(x, stats.enter)
+    if sketch is not None:
+        add_labels(out, sketch)
+    out.append('\n')
+
+    return ''.join(out), stats
+
+def main():
+    # Read command line arguments.
+    parser = ArgumentParser(description='Input parameters for the single \
+                            pass conversion and analysis.')
+    parser.add_argument('-f', '--filename', type=str, required=True,
+                        help='Filename/-path where the collection is stored, \
+                        optionally compressed (gzip, xz, zstd).')
+    parser.add_argument('-s', '--sorted', default=False, action='store_true',
+                        help='Sort key-value pairs by key.')
+    parser.add_argument('--ndjson', default=False, action='store_true',
+                        help='The collection stores one JSON document per \
+                        line instead of an array.')
+    parser.add_argument('-o', '--output', type=str, default='',
+                        help='Filename/-path of the bracket notation, \
+                        compressed if it ends with .gz, .xz, or .zst \
+                        (default=stdout).')
+    parser.add_argument('-a', '--analysis', type=str, default='',
+                        help='Filename/-path of the analysis report.')
+    parser.add_argument('--sizes', type=str, default='',
+                        help='Filename/-path where the number of nodes of \
+                        each record is stored, one per line.')
+    parser.add_argument('--index', default=False, action='store_true',
+                        help='Write the offset index <output>.idx for random \
+                        access to the records (see bracketfile.py, requires \
+                        -o).')
+    parser.add_argument('--features', type=str, default='',
+                        help='Filename/-path of the per-record features \
+                        (.npy, see feature_descr): number of nodes, depth, \
+                        number of nodes per type, maximum fanout, and a \
+                        label-frequency sketch.')
+    parser.add_argument('--sketch-bins', type=int, default=16,
+                        help='Number of bins of the label-frequency sketch \
+                        (default=16).')
+    parser.add_argument('--parser', choices=['auto'] + available(), 
+                        default='auto', help='JSON parser of the records, \
+                        the fastest installed one by default (see \
+                        jsonparse.py).')
+    parser.add_argument('--cache', default=False, action='store_true',
+                        help='Skip the collection if neither it nor the \
+                        options changed since the last run, and process only \
+                        the appended records if records were appended (see \
+                        prepcache.py, requires -o).')
+    parser.add_argument('--progress', type=float, nargs='?', const=10.0,
+                        default=None, metavar='SECONDS', help='Report the \
+                        progress to stderr every SECONDS (default=10) and the \
+                        time per phase at the end.')
+    parser.add_argument('--profile', type=str, default='',
+                        help='Filename/-path of a cProfile dump of the run \
+                        (see pstats, worker processes are not profiled).')
+    args = parser.parse_args()
+    if args.sketch_bins < 1:
+        parser.error('--sketch-bins must be positive')
+    if args.index and not args.output:
+        parser.error('--index requires -o/--output')
+    if args.cache and not args.output:
+        parser.error('--cache requires -o/--output')
+    if args.index and output_compression(args.output):
+        parser.error('--index requires an uncompressed output')
+
+    if args.profile:
+        profile(args.profile)
+
+    # Set flag to sort key-value pairs by key.
+    global sort_key
+    sort_key = args.sorted
+    json2bracket.sort_key = args.sorted
+
+    statistics = Statistics()
+    # Offset in the collection where the records to process start.
+    start = 0
+    # Bracket notation is ASCII, hence characters are bytes.
+    offset = 0
+
+    # Compare the collection and the options with the last run. The 
+    # digest of the collection is taken up to the resume point of the last 
+    # run as well, to detect appended records.
+    if args.cache:
+        cache_file = args.output + '.cache'
+        outputs = [args.output, args.sizes, args.features, args.analysis, 
+                args.output + '.idx' if args.index else '']
+        cache = prepcache.Cache([args.sorted, args.ndjson, 
+            args.sketch_bins, args.parser], [name for name in outputs if name])
+        last = prepcache.load(cache_file)
+        if not cache.matches(last):
+            last = None
+        cache.resume = prepcache.resume_point(args.filename, args.ndjson)
+        cuts = [r for r in (cache.resume, last and last.resume) 
+                if r is not None]
+        cache.sha256, prefixes = prepcache.digest(args.filename, cuts)
+        cache.resume_sha256 = prefixes.get(cache.resume)
+        if last is not None and last.sha256 == cache.sha256:
+            print(args.filename + ' is unchanged, skipped.', file=sys.stderr)
+            return
+        if (last is not None and last.resume is not None and 
+                prefixes.get(last.resume) == last.resume_sha256 and 
+                prepcache.continues(args.filename, last.resume, 
+                    args.ndjson)):
+            start = last.resume
+            statistics = last.statistics
+            offset = last.sizes[args.output]
+            print(args.filename + ': records appended, continue after ' + 
+                    str(last.records) + ' records.', file=sys.stderr)
+
+    # Append to the outputs of the last run if records were appended.
+    append = start > 0
+    out = open_output(args.output, append=append)
+    sizes = open_output(args.sizes, append=append) if args.sizes else None
+    index = IndexWriter(args.output, append) if args.index else None
+    if args.output and not args.index:
+        remove_index(args.output)
+    features = NpyWriter(args.features, feature_descr(args.sketch_bins), 
+            append) if args.features else None
+    sketch = None
+
+    raw_file = open_file(args.filename, 'rb')
+    if start > 0:
+        raw_file.seek(start)
+    progress = Progress(raw_file, args.progress) if args.progress else None
+    lap = progress.lap if progress else no_lap
+    with io.TextIOWrapper(raw_file) as json_file, out:
+        data = iter_records(json_file, args.ndjson, 
+                loads=get_loads(args.parser), resume=append)
+        if progress:
+            data = progress.iterate(data)
+        for d in data:
+            if features is not None:
+                sketch = [0]*args.sketch_bins
+            line, stats = preprocess(d, sketch)
+            lap('traverse')
+            out.write(line)
+            statistics.add(stats)
+            if sizes is not None:
+                sizes.write(str(stats.nodes()) + '\n')
+            if index is not None:
+                index.add(offset, stats.nodes())
+                offset += len(line)
+            if features is not None:
+                features.write(record_features(stats, sketch))
+            lap('write')
+
+    if sizes is not None:
+        sizes.close()
+    if index is not None:
+        index.close()
+    if features is not None:
+        features.close()
+    if args.analysis:
+        with open_file(args.analysis, 'w') as analysis:
+            statistics.report(analysis)
+    if progress:
+        progress.close()
+
+    if args.cache:
+        cache.records = statistics.records
+        cache.statistics = statistics
+        prepcache.store(cache_file, cache)
+
+    return
+
+if __name__ == '__main__':
+    main()
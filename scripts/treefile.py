@@ -0,0 +1,187 @@
+# The MIT License (MIT)
+# Copyright (c) 2021 Thomas Huetter.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""treefile.py: Binary tree format as a compact alternative to the bracket 
+notation. Trees are stored in postorder, such that they can be loaded without 
+parsing, e.g., with numpy.frombuffer.
+
+Layout (all integers little-endian):
+  header: magic b'JEDITREE', uint32 version, uint32 reserved
+  record: uint32 n, int32 parent[n], uint32 label[n]
+
+The nodes of a record are numbered in postorder, parent[i] is the postorder 
+number of the parent of node i (-1 for the root, which is node n-1), and 
+label[i] is the position of its label in the label dictionary. The 
+dictionary is stored in the sidecar file <filename>.labels as JSON array with 
+one label per line. A label is the text of a node in bracket notation, 
+e.g., '\\{\\}' for an object, '[]' for an array, '"key":' for a key."""
+
+import os
+import sys
+import stat
+import json
+import mmap
+import struct
+from array import array
+from jsontree import OBJECT, ARRAY, KEY, VALUE
+
+MAGIC = b'JEDITREE'
+VERSION = 1
+header = struct.Struct('<8sII')
+length = struct.Struct('<I')
+
+def is_tree_file(filename):
+    """Return True if the given file is stored in the binary tree format. 
+    Only regular files are probed, other files (pipes) would lose the bytes 
+    read here and are never tree files, as these are memory mapped."""
+    if not stat.S_ISREG(os.stat(filename).st_mode):
+        return False
+    with open(filename, 'rb') as tree_file:
+        return tree_file.read(len(MAGIC)) == MAGIC
+
+def to_bytes(values, typecode):
+    """Return the values as little-endian array of the given type code."""
+    values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+def from_bytes(data, typecode):
+    """Return the little-endian data as array of the given type code."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+def read_labels(filename):
+    """Return the label dictionary (list of labels) of a tree file."""
+    with open(filename + '.labels') as labels_file:
+        return json.load(labels_file)
+
+def write_labels(filename, labels):
+    """Write the label dictionary of a tree file."""
+    with open(filename + '.labels', 'w') as labels_file:
+        labels_file.write(json.dumps(labels, indent=0) + '\n')
+
+class TreeWriter:
+    """Writes records to a tree file. Labels are added to the dictionary in 
+    the order they are seen, unless a dictionary is given."""
+
+    def __init__(self, filename, labels=None):
+        self.filename = filename
+        self.ids = {label: i for i, label in enumerate(labels or [])}
+        self.fixed = labels is not None
+        self.file = open(filename, 'wb', buffering=1 << 20)
+        self.file.write(header.pack(MAGIC, VERSION, 0))
+
+    def write(self, parents, labels):
+        """Write a record given by its parent array and its node labels (both 
+        in postorder). New labels are added to the dictionary, unless it is 
+        fixed (KeyError)."""
+        ids = self.ids
+        if self.fixed:
+            label_ids = [ids[label] for label in labels]
+        else:
+            label_ids = [ids.setdefault(label, len(ids)) for label in labels]
+        self.file.write(length.pack(len(parents)) + to_bytes(parents, 'i') + 
+                to_bytes(label_ids, 'I'))
+
+    def close(self):
+        self.file.close()
+        # Dictionaries keep the insertion order, i.e., the order of the IDs.
+        write_labels(self.filename, list(self.ids))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def label_kind(label):
+    """Return the node type (see jsontree.py) of a label."""
+    if label == '\\{\\}':
+        return OBJECT
+    elif label == '[]':
+        return ARRAY
+    # Values that are strings end with a quote, keys with a colon.
+    elif label.startswith('"') and label.endswith('":'):
+        return KEY
+    return VALUE
+
+def iter_trees(filename):
+    """Yield the records of a tree file as pair of arrays (parents, label 
+    IDs) in postorder."""
+    with open(filename, 'rb') as tree_file:
+        with mmap.mmap(tree_file.fileno(), 0, 
+                access=mmap.ACCESS_READ) as data:
+            magic, version, reserved = header.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(filename + ' is not a tree file.')
+            pos = header.size
+            end = len(data)
+            while pos < end:
+                n, = length.unpack_from(data, pos)
+                pos += length.size
+                parents = from_bytes(data[pos:pos + 4*n], 'i')
+                pos += 4*n
+                labels = from_bytes(data[pos:pos + 4*n], 'I')
+                pos += 4*n
+                yield parents, labels
+
+def iter_tree_sizes(filename):
+    """Yield the number of nodes of each record of a tree file without 
+    reading the trees."""
+    with open(filename, 'rb') as tree_file:
+        size = os.fstat(tree_file.fileno()).st_size
+        magic, version, reserved = header.unpack(tree_file.read(header.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(filename + ' is not a tree file.')
+        pos = header.size
+        while pos < size:
+            tree_file.seek(pos)
+            n, = length.unpack(tree_file.read(length.size))
+            yield n
+            pos += length.size + 8*n
+
+def to_bracket(parents, labels):
+    """Return the bracket notation of a record given by its parent array and 
+    its node labels (both in postorder)."""
+    n = len(parents)
+    if n == 0:
+        return ''
+    children = [[] for i in range(n)]
+    for i in range(n - 1):
+        children[parents[i]].append(i)
+
+    # Write the nodes in preorder, children are numbered in ascending order.
+    out = []
+    stack = [n - 1]
+    while stack:
+        i = stack.pop()
+        if i < 0:
+            out.append('}')
+            continue
+        out.append('{' + labels[i])
+        stack.append(-1)
+        stack.extend(reversed(children[i]))
+
+    return ''.join(out)